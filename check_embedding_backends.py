@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from itertools import islice
+
+from research_assistant.config import get_settings
+from research_assistant.embedding_benchmark import compare_backends
+from research_assistant.embeddings import EMBEDDING_BACKENDS
+from research_assistant.vector_store import PaperStore
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare embedding backends against the PyTorch baseline.")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Max allowed cosine score delta vs PyTorch.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed encode passes per backend.")
+    parser.add_argument(
+        "--from-store",
+        type=int,
+        default=0,
+        help="Use up to N indexed paper documents as the sample texts instead of the built-in sentences.",
+    )
+    args = parser.parse_args()
+
+    settings = get_settings()
+    texts: list[str] | None = None
+    if args.from_store > 0:
+        store = PaperStore(str(settings.chroma_dir))
+        rows = islice(store.iter_papers(page_size=args.from_store, include=("documents",)), args.from_store)
+        texts = [row["document"] for row in rows] or None
+
+    rows = compare_backends(
+        settings.embedding_model,
+        args.backends,
+        texts=texts,
+        tolerance=args.tolerance,
+        repeats=args.repeats,
+        onnx_file=settings.embedding_onnx_file,
+    )
+
+    print(f"Embedding backend comparison for {settings.embedding_model}")
+    print(json.dumps(rows, indent=2))
+
+    if all(row.get("parity_ok") for row in rows):
+        print("\n✅ All backends are within tolerance of the PyTorch baseline.")
+        return 0
+
+    print("\n❌ Some backends failed to load or drifted beyond tolerance. See above.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
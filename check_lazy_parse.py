@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from research_assistant.app import build_pipeline
+from research_assistant.config import get_settings
+from research_assistant.models import PaperInsight
+
+
+def _sample_pdf(path: Path, pages: int) -> None:
+    with fitz.open() as doc:
+        for number in range(pages):
+            lines = [f"Page {number + 1}, line {line}: loss = {number} * lambda + {line}" for line in range(40)]
+            doc.new_page().insert_text((40, 40), "\n".join(lines), fontsize=7)
+        doc.save(path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Ingest a generated PDF and check the LLM hops ran before every page was extracted."
+    )
+    parser.add_argument("--pages", type=int, default=60, help="Pages in the generated PDF.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        # Everything goes to a scratch directory; the LLM hops are replaced by a
+        # stub, so no server is needed and the real library is left alone.
+        settings = dataclasses.replace(
+            get_settings(), data_dir=root, chroma_dir=root / "chroma", reports_dir=root / "reports"
+        )
+        pdf_path = root / "sample.pdf"
+        _sample_pdf(pdf_path, args.pages)
+        pipeline = build_pipeline(settings)
+
+        seen: dict[str, int] = {}
+
+        def analyze_paper(parsed, completed_hops=None, on_hop=None) -> PaperInsight:
+            seen["pages_at_analysis"] = parsed.extracted_pages
+            seen["page_count"] = parsed.page_count
+            return PaperInsight("", [], [], "other", [], "", [], [], [], [])
+
+        pipeline.llm_client.analyze_paper = analyze_paper
+        message = pipeline.ingest_pdf(pdf_path)
+        stored = pipeline.store.get_papers([pipeline.paper_id_for(pdf_path)])
+        seen["passages"] = pipeline.store.passages.count()
+
+    print("Lazy parse check")
+    print(message)
+    print(json.dumps(seen, indent=2))
+
+    if stored and 0 < seen.get("pages_at_analysis", 0) < seen.get("page_count", 0):
+        print("\n✅ The near-duplicate check and LLM hops ran on a partially extracted paper.")
+        return 0
+
+    print("\n❌ Every page was extracted before the LLM hops (or the paper was not stored).")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,26 @@
 from __future__ import annotations
 
+import argparse
+
 from research_assistant.config import get_settings
 from research_assistant.report import generate_paper_report_from_metadata
 from research_assistant.vector_store import PaperStore
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate per-paper reports for indexed papers.")
+    parser.add_argument("--page-size", type=int, default=PaperStore.PAGE_SIZE, help="Papers fetched per Chroma page.")
+    args = parser.parse_args()
+
     settings = get_settings()
     store = PaperStore(str(settings.chroma_dir))
-    rows = store.all_papers()
-    if not rows:
-        print("No indexed papers found.")
-        return
-
-    for row in rows:
+    written = 0
+    for row in store.iter_papers(page_size=args.page_size, include=("metadatas",)):
         path = generate_paper_report_from_metadata(row["metadata"], settings.reports_dir)
         print(path)
+        written += 1
+    if not written:
+        print("No indexed papers found.")
 
 
 if __name__ == "__main__":
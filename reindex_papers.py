@@ -1,41 +1,143 @@
 from __future__ import annotations
 
 import argparse
+import json
+import time
 from pathlib import Path
 
+from research_assistant.app import build_engine, build_pipeline
+from research_assistant.async_llm_client import AsyncLocalLLMClient
 from research_assistant.config import get_settings
-from research_assistant.embeddings import Embedder
+from research_assistant.embeddings import EmbeddingService
+from research_assistant.hop_memo import HopMemo
+from research_assistant.ingest_engine import IngestResult
 from research_assistant.llm_client import LocalLLMClient
-from research_assistant.pipeline import IngestionPipeline
-from research_assistant.vector_store import PaperStore
+from research_assistant.parse_cache import ParseCache
+
+
+def _cache_summary(
+    llm_client: LocalLLMClient,
+    embedder: EmbeddingService,
+    hop_memo: HopMemo,
+    parse_cache: ParseCache,
+    async_llm: AsyncLocalLLMClient | None = None,
+) -> str:
+    stats = llm_client.cache.stats()
+    transport = llm_client.transport.stats()
+    if async_llm is not None:
+        transport = {name: count + async_llm.stats()[name] for name, count in transport.items()}
+    lines = [
+        f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"(hit ratio {stats['hit_ratio']:.0%}, {stats['size_bytes'] / 1e6:.1f} MB)",
+        f"LLM server: {transport['requests']} requests, {transport['retries']} retries, "
+        f"{transport['failures']} failures",
+    ]
+    memo = hop_memo.stats()
+    lines.append(
+        f"Hop memo: {memo['hits']} hops reused, {memo['misses']} recomputed (hit ratio {memo['hit_ratio']:.0%})"
+    )
+    embedding_stats = embedder.cache_stats()
+    if embedding_stats:
+        lines.append(
+            f"Embedding cache: {embedding_stats['hits']} hits, {embedding_stats['misses']} misses "
+            f"(hit ratio {embedding_stats['hit_ratio']:.0%})"
+        )
+    if parse_cache.enabled:
+        parsed = parse_cache.stats()
+        lines.append(f"Parse cache: {parsed['papers']} papers ({parsed['bytes'] / 1e6:.1f} MB)")
+    return "\n".join(lines)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def _load_checkpoint(path: Path) -> set[str]:
+    if not path.exists():
+        return set()
+    done: set[str] = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            done.add(json.loads(line)["path"])
+    return done
+
+
+class _Progress:
+    def __init__(self, total: int, checkpoint: Path) -> None:
+        self.total = total
+        self.checkpoint = checkpoint
+        self.done = 0
+        self.started = time.monotonic()
+
+    def __call__(self, result: IngestResult) -> None:
+        self.done += 1
+        if result.ok:
+            # One line per finished paper; an interrupted run skips these on restart.
+            with self.checkpoint.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps({"path": str(result.pdf_path)}) + "\n")
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.done / elapsed
+        eta = _format_duration((self.total - self.done) / rate)
+        print(f"[{self.done}/{self.total}] {result.message} | {rate * 60:.1f} papers/min, ETA {eta}")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Re-index papers to refresh richer metadata.")
     parser.add_argument("--file", type=str, default="", help="Single PDF path to re-index.")
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help=(
+            "Ignore cached LLM responses and memoized hops and query the server again "
+            "(fresh answers still refresh both)."
+        ),
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Papers analyzed concurrently (default: INGEST_LLM_WORKERS)."
+    )
+    parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only reprocess papers whose PDF, embedding model, LLM model or prompt versions changed.",
+    )
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run.")
     args = parser.parse_args()
 
     settings = get_settings()
-    store = PaperStore(str(settings.chroma_dir))
-    embedder = Embedder(settings.embedding_model)
-    llm_client = LocalLLMClient(settings)
-    pipeline = IngestionPipeline(
-        store=store,
-        embedder=embedder,
-        llm_client=llm_client,
-        reports_dir=settings.reports_dir,
-    )
+    pipeline = build_pipeline(settings, llm_cache=not args.no_llm_cache)
+    llm_client, embedder = pipeline.llm_client, pipeline.embedder
+    unfinished = pipeline.journal.stats()["unfinished_papers"]
+    if unfinished:
+        print(f"Resuming {unfinished} interrupted paper(s) from the ingest journal.")
 
     if args.file:
         target = Path(args.file).expanduser().resolve()
         if not target.exists() or target.suffix.lower() != ".pdf":
             raise SystemExit(f"Invalid PDF path: {target}")
         print(pipeline.ingest_pdf(target, force=True))
+        print(_cache_summary(llm_client, embedder, pipeline.hop_memo, pipeline.parse_cache))
         return
 
-    for pdf_path in sorted(settings.watch_dir.glob("*.pdf")):
-        print(pipeline.ingest_pdf(pdf_path, force=True))
+    engine = build_engine(pipeline, settings, llm_workers=args.workers)
+
+    checkpoint = settings.data_dir / "reindex_checkpoint.jsonl"
+    if args.restart:
+        checkpoint.unlink(missing_ok=True)
+    done = _load_checkpoint(checkpoint)
+    if done:
+        print(f"Resuming interrupted re-index: {len(done)} paper(s) already done (--restart to start over).")
+    targets = [path for path in sorted(settings.watch_dir.glob("*.pdf")) if str(path) not in done]
+    if args.changed_only:
+        before = len(targets)
+        targets = pipeline.outdated(targets)
+        print(f"{len(targets)} of {before} paper(s) changed since they were indexed.")
 
+    engine.ingest_many(targets, force=True, on_result=_Progress(len(targets), checkpoint))
+    # A complete pass leaves nothing to resume.
+    checkpoint.unlink(missing_ok=True)
+    print(_cache_summary(llm_client, embedder, pipeline.hop_memo, pipeline.parse_cache, engine.async_llm))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from research_assistant.config import get_settings
+from research_assistant.retry_queue import RetryQueue
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List or requeue PDFs the watcher failed to ingest.")
+    parser.add_argument("paths", nargs="*", help="PDF paths to requeue.")
+    parser.add_argument("--all", action="store_true", help="Requeue every dead-lettered PDF.")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    queue = RetryQueue(settings.data_dir / "ingest_retry_queue.sqlite3", max_attempts=settings.ingest_max_attempts)
+    if args.all or args.paths:
+        paths = None if args.all else [str(Path(path).resolve()) for path in args.paths]
+        requeued = queue.requeue(paths)
+        print(f"Requeued {requeued} file(s); the watcher picks them up on its next scan.")
+        return
+
+    failures = sorted(queue.load().values(), key=lambda item: (item.status, item.path))
+    if not failures:
+        print("No failed PDFs.")
+        return
+    now = time.time()
+    for item in failures:
+        if item.status == RetryQueue.DEAD:
+            state = f"dead after {item.attempts} attempts"
+        else:
+            state = f"retry {item.attempts}/{queue.max_attempts} in {max(0, round(item.next_attempt_at - now))}s"
+        print(f"{item.path}  [{state}]  {item.last_error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from .async_llm_client import AsyncLocalLLMClient
+from .config import Settings
+from .embeddings import build_embedding_service
+from .hop_memo import HopMemo
+from .ingest_engine import StagedIngestionEngine
+from .journal import IngestJournal
+from .llm_client import LocalLLMClient
+from .manifest import IngestManifest
+from .near_duplicates import NearDuplicateIndex
+from .parse_cache import ParseCache
+from .parser import ParseOptions
+from .pipeline import IngestionPipeline
+from .vector_store import PaperStore
+
+
+# The wiring shared by the watcher, re-index and Streamlit entry points. The
+# store, embedder and LLM client are reachable as pipeline.store,
+# pipeline.embedder and pipeline.llm_client.
+def build_pipeline(settings: Settings, *, llm_cache: bool = True) -> IngestionPipeline:
+    llm_client = LocalLLMClient(settings)
+    hop_memo = HopMemo(settings.data_dir / "hop_memo.sqlite3")
+    # Without the cache, answers are fetched again but still refresh the cache and memo.
+    llm_client.cache.bypass = not llm_cache
+    hop_memo.bypass = not llm_cache
+    return IngestionPipeline(
+        store=PaperStore(str(settings.chroma_dir), lexical_dir=settings.data_dir / "lexical_index"),
+        embedder=build_embedding_service(settings),
+        llm_client=llm_client,
+        reports_dir=settings.reports_dir,
+        passage_size=settings.passage_size,
+        passage_overlap=settings.passage_overlap,
+        hybrid_search=settings.search_hybrid,
+        manifest=IngestManifest(settings.data_dir / "ingest_manifest.sqlite3"),
+        near_duplicates=(
+            NearDuplicateIndex(
+                settings.data_dir / "near_duplicates.sqlite3", threshold=settings.near_duplicate_threshold
+            )
+            if settings.near_duplicate_threshold > 0
+            else None
+        ),
+        journal=IngestJournal(settings.data_dir / "ingest_journal.sqlite3"),
+        hop_memo=hop_memo,
+        parse_options=ParseOptions(
+            max_pages=settings.parse_max_pages,
+            page_workers=settings.parse_page_workers,
+            parallel_min_pages=settings.parse_parallel_min_pages,
+            slow_page_seconds=settings.parse_slow_page_seconds,
+        ),
+        parse_cache=ParseCache(settings.data_dir / "parse_cache", enabled=settings.parse_cache_enabled),
+    )
+
+
+def build_engine(pipeline: IngestionPipeline, settings: Settings, llm_workers: int = 0) -> StagedIngestionEngine:
+    return StagedIngestionEngine(
+        pipeline=pipeline,
+        parse_workers=settings.ingest_parse_workers,
+        llm_workers=llm_workers or settings.ingest_llm_workers,
+        embed_batch_size=settings.ingest_embed_batch_size,
+        upsert_batch_size=settings.ingest_upsert_batch_size,
+        async_llm=(
+            AsyncLocalLLMClient(settings, cache=pipeline.llm_client.cache) if settings.ingest_async_llm else None
+        ),
+    )
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable
+
+import httpx
+
+from .config import Settings
+from .http_transport import RETRYABLE_STATUS_CODES, backoff_delay, retry_after_seconds
+from .limiter import get_request_limiter
+from .llm_cache import LLMResponseCache
+from .llm_client import LocalLLMClient
+from .models import PaperInsight, ParsedPaper
+from .parser import LazyParsedPaper
+
+
+class AsyncLocalLLMClient:
+    INPUT_TOKEN_BUDGET = LocalLLMClient.INPUT_TOKEN_BUDGET
+    BACKOFF_MAX_SECONDS = 20.0
+
+    def __init__(self, settings: Settings, cache: LLMResponseCache | None = None) -> None:
+        self.settings = settings
+        # Pass the sync client's cache to share its bypass flag and hit counters.
+        self.cache = cache or LLMResponseCache(
+            settings.data_dir / "llm_cache.sqlite3",
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            enabled=settings.llm_cache_enabled,
+        )
+        self.limiter = get_request_limiter(settings.llm_max_in_flight)
+        # httpx clients are bound to the loop that created them, and one client
+        # object may serve several loops at once (Streamlit reruns, concurrent
+        # ingests through a shared engine), so each loop gets its own.
+        self._http: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    async def __aenter__(self) -> AsyncLocalLLMClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        # Only the running loop's client; other loops may be mid-request.
+        with self._lock:
+            http = self._http.pop(asyncio.get_running_loop(), None)
+        if http is not None:
+            await http.aclose()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            http = self._http.get(loop)
+            if http is None:
+                http = self._http[loop] = httpx.AsyncClient(
+                    headers=LocalLLMClient._headers(self.settings),
+                    timeout=httpx.Timeout(self.settings.llm_timeout, connect=self.settings.llm_connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.settings.llm_pool_size,
+                        max_keepalive_connections=self.settings.llm_pool_size,
+                    ),
+                )
+        return http
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self._count("_requests")
+        attempt = 0
+        while True:
+            try:
+                async with self.limiter:
+                    response = await self._client().request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.settings.llm_max_retries:
+                    self._count("_failures")
+                    raise
+                delay = backoff_delay(attempt, self.settings.llm_retry_backoff, self.BACKOFF_MAX_SECONDS)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.is_error:
+                        self._count("_failures")
+                    return response
+                if attempt >= self.settings.llm_max_retries:
+                    self._count("_failures")
+                    return response
+                delay = retry_after_seconds(response.headers, self.BACKOFF_MAX_SECONDS) or backoff_delay(
+                    attempt, self.settings.llm_retry_backoff, self.BACKOFF_MAX_SECONDS
+                )
+            self._count("_retries")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _cache_key(self, prompt: str) -> str:
+        return self.cache.build_key(
+            self.settings.llm_model,
+            LocalLLMClient.SYSTEM_PROMPT,
+            prompt,
+            LocalLLMClient.TEMPERATURE,
+            LocalLLMClient.MAX_TOKENS,
+        )
+
+    async def _chat(self, prompt: str, use_cache: bool = True) -> str:
+        cache_key = self._cache_key(prompt) if use_cache else ""
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        url = f"{self.settings.llm_api_base.rstrip('/')}/chat/completions"
+        response = await self._request(
+            "POST", url, json=LocalLLMClient._chat_payload(self.settings.llm_model, prompt)
+        )
+        response.raise_for_status()
+        content = response.json()["choices"][0]["message"]["content"]
+        if use_cache:
+            self.cache.put(cache_key, content)
+        return content
+
+    async def _chat_json(self, prompt: str) -> dict[str, Any]:
+        bounded_prompt = LocalLLMClient._truncate_to_token_budget(prompt, self.INPUT_TOKEN_BUDGET)
+        try:
+            response = await self._chat(bounded_prompt)
+        except Exception:
+            return {}
+        try:
+            return LocalLLMClient._safe_json(response)
+        except Exception:
+            self.cache.discard(self._cache_key(bounded_prompt))
+            return {}
+
+    async def check_server(self) -> dict[str, Any]:
+        base = self.settings.llm_api_base.rstrip("/")
+        result: dict[str, Any] = {
+            "ok": False,
+            "base_url": base,
+            "model": self.settings.llm_model,
+            "models_endpoint": f"{base}/models",
+            "chat_endpoint": f"{base}/chat/completions",
+        }
+        try:
+            models_resp = await self._request("GET", f"{base}/models", timeout=15)
+            result["models_status_code"] = models_resp.status_code
+            if models_resp.is_success:
+                data = models_resp.json()
+                result["available_models"] = [item.get("id", "") for item in data.get("data", [])]
+            else:
+                result["models_error"] = models_resp.text[:300]
+        except Exception as exc:
+            result["models_error"] = str(exc)
+
+        try:
+            _ = await self._chat("Return exactly: OK", use_cache=False)
+            result["chat_ok"] = True
+        except Exception as exc:
+            result["chat_ok"] = False
+            result["chat_error"] = str(exc)
+
+        LocalLLMClient._server_summary(self.settings, result)
+        result["llm_cache"] = self.cache.stats()
+        result["transport"] = self.stats()
+        result["limiter"] = self.limiter.stats()
+        return result
+
+    async def analyze_paper(
+        self,
+        parsed: ParsedPaper | LazyParsedPaper,
+        completed_hops: dict[str, dict[str, Any]] | None = None,
+        on_hop: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> PaperInsight:
+        # Same resume contract as LocalLLMClient.analyze_paper: hops found in
+        # completed_hops are reused and every new non-empty hop goes to on_hop.
+        completed = completed_hops or {}
+        context = LocalLLMClient._paper_context(parsed)
+        stage_one = completed.get("stage_one")
+        if not stage_one:
+            stage_one = await self._chat_json(LocalLLMClient._stage_one_prompt(context))
+            if stage_one and on_hop is not None:
+                on_hop("stage_one", stage_one)
+        prompts = LocalLLMClient._stage_two_prompts(stage_one, context)
+        stage_two = {name: completed[name] for name in prompts if completed.get(name)}
+        pending = {name: prompt for name, prompt in prompts.items() if name not in stage_two}
+        hop_slots = asyncio.Semaphore(max(1, self.settings.llm_hop_concurrency))
+
+        async def run_hop(name: str, prompt: str) -> dict[str, Any]:
+            async with hop_slots:
+                output = await self._chat_json(prompt)
+            if output and on_hop is not None:
+                on_hop(name, output)
+            return output
+
+        outputs = await asyncio.gather(*(run_hop(name, prompt) for name, prompt in pending.items()))
+        stage_two.update(zip(pending, outputs))
+        return LocalLLMClient._assemble_insight(parsed, stage_one, stage_two)
+
+    async def analyze_many(self, papers: list[ParsedPaper]) -> list[PaperInsight]:
+        return list(await asyncio.gather(*(self.analyze_paper(parsed) for parsed in papers)))
+
+    async def explain_highlight(
+        self,
+        highlight_text: str,
+        related_concepts: list[str],
+        expertise_level: str = "ML researcher",
+        include_simplified: bool = False,
+    ) -> dict[str, Any]:
+        prompt = LocalLLMClient._highlight_prompt(
+            highlight_text, related_concepts, expertise_level, include_simplified
+        )
+        payload = await self._chat_json(prompt)
+        return LocalLLMClient._highlight_result(payload, related_concepts, include_simplified)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"requests": self._requests, "retries": self._retries, "failures": self._failures}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
@@ -14,12 +14,51 @@ load_dotenv()
 class Settings:
     watch_dir: Path
     chroma_dir: Path
+    data_dir: Path
     reports_dir: Path
     embedding_model: str
+    embedding_backend: str
+    embedding_onnx_file: str
+    embedding_cache_enabled: bool
+    embedding_cache_max_mb: int
+    embedding_max_batch_size: int
+    embedding_max_wait_ms: float
     llm_api_base: str
     llm_api_key: str
     llm_model: str
+    llm_hop_concurrency: int
+    llm_max_in_flight: int
+    llm_cache_enabled: bool
+    llm_cache_max_mb: int
+    llm_pool_size: int
+    llm_connect_timeout: float
+    llm_timeout: float
+    llm_max_retries: int
+    llm_retry_backoff: float
     watch_interval: int
+    watch_mode: str
+    watch_recursive: bool
+    watch_settle_seconds: float
+    watch_priority: str
+    watch_priority_dir: str
+    watch_max_in_flight: int
+    ingest_parse_workers: int
+    ingest_llm_workers: int
+    ingest_async_llm: bool
+    ingest_embed_batch_size: int
+    ingest_upsert_batch_size: int
+    ingest_max_attempts: int
+    ingest_retry_base_seconds: float
+    ingest_retry_max_seconds: float
+    parse_max_pages: int
+    parse_page_workers: int
+    parse_parallel_min_pages: int
+    parse_slow_page_seconds: float
+    parse_cache_enabled: bool
+    passage_size: int
+    passage_overlap: int
+    search_hybrid: bool
+    near_duplicate_threshold: float
 
 
 
@@ -37,23 +76,69 @@ def _resolve_watch_dir(raw: str) -> Path:
 
 
 
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
+
 def get_settings() -> Settings:
     watch_dir = _resolve_watch_dir(os.getenv("WATCH_DIR", "/papers"))
     chroma_dir = Path(os.getenv("CHROMA_DIR", "./data/chroma")).resolve()
     reports_dir = Path(os.getenv("REPORTS_DIR", "./reports")).resolve()
+    data_dir = Path(os.getenv("DATA_DIR", "./data")).resolve()
 
     chroma_dir.mkdir(parents=True, exist_ok=True)
+    data_dir.mkdir(parents=True, exist_ok=True)
     reports_dir.mkdir(parents=True, exist_ok=True)
 
     return Settings(
         watch_dir=watch_dir,
         chroma_dir=chroma_dir,
+        data_dir=data_dir,
         reports_dir=reports_dir,
         embedding_model=os.getenv(
             "EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
         ),
+        embedding_backend=os.getenv("EMBEDDING_BACKEND", "torch").strip().lower(),
+        embedding_onnx_file=os.getenv("EMBEDDING_ONNX_FILE", ""),
+        embedding_cache_enabled=_env_flag("EMBEDDING_CACHE_ENABLED", "true"),
+        embedding_cache_max_mb=int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024")),
+        embedding_max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64")),
+        embedding_max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")),
         llm_api_base=os.getenv("LLM_API_BASE", "http://localhost:11434/v1"),
         llm_api_key=os.getenv("LLM_API_KEY", "local-key"),
         llm_model=os.getenv("LLM_MODEL", "llama3.1"),
+        llm_hop_concurrency=int(os.getenv("LLM_HOP_CONCURRENCY", "3")),
+        llm_max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+        llm_cache_enabled=_env_flag("LLM_CACHE_ENABLED", "true"),
+        llm_cache_max_mb=int(os.getenv("LLM_CACHE_MAX_MB", "512")),
+        llm_pool_size=int(os.getenv("LLM_POOL_SIZE", "8")),
+        llm_connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+        llm_timeout=float(os.getenv("LLM_TIMEOUT", "90")),
+        llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        llm_retry_backoff=float(os.getenv("LLM_RETRY_BACKOFF", "0.5")),
         watch_interval=int(os.getenv("WATCH_INTERVAL", "10")),
+        watch_mode=os.getenv("WATCH_MODE", "auto").strip().lower(),
+        watch_recursive=_env_flag("WATCH_RECURSIVE", "false"),
+        watch_settle_seconds=float(os.getenv("WATCH_SETTLE_SECONDS", "2")),
+        watch_priority=os.getenv("WATCH_PRIORITY", "newest").strip().lower(),
+        watch_priority_dir=os.getenv("WATCH_PRIORITY_DIR", "").strip(),
+        watch_max_in_flight=int(os.getenv("WATCH_MAX_IN_FLIGHT", "16")),
+        ingest_parse_workers=int(os.getenv("INGEST_PARSE_WORKERS", "2")),
+        ingest_llm_workers=int(os.getenv("INGEST_LLM_WORKERS", "2")),
+        ingest_async_llm=_env_flag("INGEST_ASYNC_LLM", "false"),
+        ingest_embed_batch_size=int(os.getenv("INGEST_EMBED_BATCH_SIZE", "16")),
+        ingest_upsert_batch_size=int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "32")),
+        ingest_max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS", "5")),
+        ingest_retry_base_seconds=float(os.getenv("INGEST_RETRY_BASE_SECONDS", "60")),
+        ingest_retry_max_seconds=float(os.getenv("INGEST_RETRY_MAX_SECONDS", "21600")),
+        parse_max_pages=int(os.getenv("PARSE_MAX_PAGES", "0")),
+        parse_page_workers=int(os.getenv("PARSE_PAGE_WORKERS", "1")),
+        parse_parallel_min_pages=int(os.getenv("PARSE_PARALLEL_MIN_PAGES", "64")),
+        parse_slow_page_seconds=float(os.getenv("PARSE_SLOW_PAGE_SECONDS", "2")),
+        parse_cache_enabled=_env_flag("PARSE_CACHE_ENABLED", "true"),
+        passage_size=int(os.getenv("PASSAGE_SIZE", "1200")),
+        passage_overlap=int(os.getenv("PASSAGE_OVERLAP", "200")),
+        search_hybrid=_env_flag("SEARCH_HYBRID", "true"),
+        near_duplicate_threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8")),
     )
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import numpy as np
+
+from .embeddings import load_sentence_transformer
+
+SAMPLE_TEXTS = [
+    "Token routing in sparse mixture-of-experts transformers.",
+    "Grouped-query attention (GQA) reduces KV-cache memory during decoding.",
+    "Scaling laws relate loss to parameters, data and compute.",
+    "AdamW with cosine learning-rate decay and linear warmup.",
+    "Proximal policy optimization for reinforcement learning from human feedback.",
+    "Speculative decoding accelerates autoregressive generation with a draft model.",
+    "Data deduplication improves downstream accuracy of pretrained language models.",
+    "FlashAttention computes exact attention with IO-aware tiling.",
+    "Low-rank adaptation fine-tunes large models with few trainable parameters.",
+    "Contrastive pretraining aligns image and text embeddings.",
+    "Quantization to int8 preserves accuracy while reducing latency on CPUs.",
+    "Diffusion models generate images by iteratively denoising Gaussian noise.",
+    "Retrieval-augmented generation grounds answers in retrieved passages.",
+    "A theoretical analysis of generalization in overparameterized networks.",
+    "Pipeline parallelism splits layers across devices to train larger models.",
+    "Curriculum learning orders training examples from easy to hard.",
+]
+
+
+def _encode(model: Any, texts: list[str], batch_size: int) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+
+
+def _measure(model: Any, texts: list[str], repeats: int, batch_size: int) -> tuple[np.ndarray, float]:
+    _encode(model, texts[: min(len(texts), 4)], batch_size)
+    started = time.perf_counter()
+    for _ in range(max(1, repeats)):
+        vectors = _encode(model, texts, batch_size)
+    elapsed = time.perf_counter() - started
+    return vectors, (len(texts) * max(1, repeats)) / max(elapsed, 1e-9)
+
+
+def compare_backends(
+    model_name: str,
+    backends: list[str],
+    texts: list[str] | None = None,
+    tolerance: float = 0.02,
+    repeats: int = 3,
+    batch_size: int = 32,
+    onnx_file: str = "",
+) -> list[dict[str, Any]]:
+    texts = texts or SAMPLE_TEXTS
+
+    started = time.perf_counter()
+    baseline_model = load_sentence_transformer(model_name, "torch")
+    baseline_load = time.perf_counter() - started
+    baseline, baseline_rate = _measure(baseline_model, texts, repeats, batch_size)
+    baseline_scores = baseline @ baseline.T
+
+    rows: list[dict[str, Any]] = [
+        {
+            "backend": "torch",
+            "load_seconds": round(baseline_load, 3),
+            "texts_per_second": round(baseline_rate, 1),
+            "speedup": 1.0,
+            "max_score_delta": 0.0,
+            "min_vector_cosine": 1.0,
+            "parity_ok": True,
+        }
+    ]
+    for backend in backends:
+        if backend == "torch":
+            continue
+        row: dict[str, Any] = {"backend": backend}
+        try:
+            started = time.perf_counter()
+            model = load_sentence_transformer(model_name, backend, onnx_file if backend != "onnx" else "")
+            row["load_seconds"] = round(time.perf_counter() - started, 3)
+            vectors, rate = _measure(model, texts, repeats, batch_size)
+        except Exception as exc:
+            row.update({"error": str(exc), "parity_ok": False})
+            rows.append(row)
+            continue
+
+        # Search quality depends on cosine scores, so compare the score matrices
+        # rather than raw vector components.
+        score_delta = float(np.max(np.abs(vectors @ vectors.T - baseline_scores)))
+        vector_cosine = float(np.min(np.sum(vectors * baseline, axis=1)))
+        row.update(
+            {
+                "texts_per_second": round(rate, 1),
+                "speedup": round(rate / max(baseline_rate, 1e-9), 2),
+                "max_score_delta": round(score_delta, 5),
+                "min_vector_cosine": round(vector_cosine, 5),
+                "parity_ok": score_delta <= tolerance,
+            }
+        )
+        rows.append(row)
+    return rows
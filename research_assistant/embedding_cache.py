@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+
+class EmbeddingCache:
+    LOOKUP_CHUNK = 500
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+            if "size" not in columns:
+                # Caches written before the size cap existed: old entries are evicted first.
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE embeddings SET size = length(vector)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+            # The watcher and the Streamlit app share this file, so the byte total
+            # lives in the database and every writer updates it in its transaction.
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO usage (id, total_bytes) SELECT 0, COALESCE(SUM(size), 0) FROM embeddings"
+            )
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, text_hashes: Iterable[str]) -> dict[str, np.ndarray]:
+        wanted = list(dict.fromkeys(text_hashes))
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(wanted), self.LOOKUP_CHUNK):
+                chunk = wanted[start : start + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, text_hash) for text_hash in found],
+                    )
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, np.ndarray]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for text_hash, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((model, text_hash, int(vector.shape[-1]), blob, len(blob), now))
+        # The connection block commits, or rolls back if a write fails, so the
+        # connection is never left inside an open transaction.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            replaced = 0
+            hashes = list(vectors)
+            for start in range(0, len(hashes), self.LOOKUP_CHUNK):
+                chunk = hashes[start : start + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                row = self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchone()
+                replaced += int(row[0])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            total = self._add_bytes(sum(row[4] for row in rows) - replaced)
+            if total > self.max_bytes:
+                self._evict(total)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            size_bytes = self._total_bytes()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT total_bytes FROM usage WHERE id = 0").fetchone()[0])
+
+    def _add_bytes(self, delta: int) -> int:
+        self._conn.execute("UPDATE usage SET total_bytes = MAX(total_bytes + ?, 0) WHERE id = 0", (delta,))
+        return self._total_bytes()
+
+    def _evict(self, total: int) -> None:
+        target = int(self.max_bytes * self.EVICTION_TARGET)
+        while total > target:
+            rows = self._conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_used ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._conn.execute("UPDATE usage SET total_bytes = 0 WHERE id = 0")
+                return
+            freed = 0
+            for model, text_hash, size in rows:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", (model, text_hash))
+                freed += int(size)
+                self.evictions += 1
+                if total - freed <= target:
+                    break
+            total = self._add_bytes(-freed)
@@ -1,12 +1,202 @@
 from __future__ import annotations
 
-from sentence_transformers import SentenceTransformer
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .config import Settings
+from .embedding_cache import EmbeddingCache
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_INT8_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch", onnx_file: str = "") -> SentenceTransformer:
+    # Imported here: parse workers re-import the entry script, and torch and
+    # transformers would add seconds to every one of them.
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+    if backend == "onnx-int8":
+        return SentenceTransformer(
+            model_name, backend="onnx", model_kwargs={"file_name": onnx_file or DEFAULT_INT8_ONNX_FILE}
+        )
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
 
 
 class Embedder:
-    def __init__(self, model_name: str) -> None:
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str,
+        cache: EmbeddingCache | None = None,
+        backend: str = "torch",
+        onnx_file: str = "",
+    ) -> None:
+        self.model_name = model_name
+        self.backend = backend
+        self.model = load_sentence_transformer(model_name, backend, onnx_file)
+        self.cache = cache
+        # Quantized vectors differ slightly from the PyTorch ones, so each backend
+        # and ONNX file gets its own version, used as the cache namespace and
+        # stored with every paper (the PyTorch one keeps the plain model name).
+        if backend == "torch":
+            self.version = model_name
+        else:
+            self.version = f"{model_name}#{backend}" + (f":{onnx_file}" if onnx_file else "")
+        self.cache_namespace = self.version
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self._encode(texts)
+
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.cache_namespace, hashes)
+        missing = {text_hash: text for text_hash, text in zip(hashes, texts) if text_hash not in vectors}
+        if missing:
+            encoded = dict(zip(missing, self._encode(list(missing.values()))))
+            self.cache.put_many(self.cache_namespace, encoded)
+            vectors.update(encoded)
+        return np.stack([vectors[text_hash] for text_hash in hashes])
+
+    def cache_stats(self) -> dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+@dataclass
+class _EmbeddingRequest:
+    texts: list[str]
+    done: threading.Event = field(default_factory=threading.Event)
+    result: np.ndarray | None = None
+    error: BaseException | None = None
+
+
+class EmbeddingService:
+    def __init__(self, embedder: Embedder, max_batch_size: int = 64, max_wait_ms: float = 5.0) -> None:
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue[_EmbeddingRequest] = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.embedder.model_name
+
+    @property
+    def version(self) -> str:
+        return self.embedder.version
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        request = _EmbeddingRequest(texts=list(texts))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def cache_stats(self) -> dict[str, Any]:
+        return self.embedder.cache_stats()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "mean_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+            }
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.embedder.embed(texts)
+            except BaseException as exc:
+                for request in batch:
+                    request.error = exc
+                    request.done.set()
+                continue
+
+            offset = 0
+            for request in batch:
+                request.result = vectors[offset : offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._texts += len(texts)
+
+    def _collect_batch(self) -> list[_EmbeddingRequest]:
+        # Coalesce requests from the pipeline, companion and search until the
+        # batch is full or the oldest request has waited max_wait_ms.
+        first = self._queue.get()
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+
+def build_embedder(settings: Settings) -> Embedder:
+    cache = (
+        EmbeddingCache(
+            settings.data_dir / "embedding_cache.sqlite3", max_bytes=settings.embedding_cache_max_mb * 1024 * 1024
+        )
+        if settings.embedding_cache_enabled
+        else None
+    )
+    return Embedder(
+        settings.embedding_model,
+        cache=cache,
+        backend=settings.embedding_backend,
+        onnx_file=settings.embedding_onnx_file,
+    )
+
 
-    def embed(self, texts: list[str]) -> list[list[float]]:
-        vectors = self.model.encode(texts, normalize_embeddings=True)
-        return [vector.tolist() for vector in vectors]
+def build_embedding_service(settings: Settings) -> EmbeddingService:
+    return EmbeddingService(
+        build_embedder(settings),
+        max_batch_size=settings.embedding_max_batch_size,
+        max_wait_ms=settings.embedding_max_wait_ms,
+    )
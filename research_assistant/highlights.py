@@ -5,6 +5,9 @@ from pathlib import Path
 
 import fitz
 
+from .hashing import file_sha256
+from .parse_cache import ParseCache
+
 
 @dataclass
 class HighlightedParagraph:
@@ -39,27 +42,43 @@ def _paragraph_from_blocks(page: fitz.Page, rect: fitz.Rect) -> str:
     return page.get_textbox(rect).strip()
 
 
-def extract_highlighted_paragraphs(pdf_path: Path) -> list[HighlightedParagraph]:
+def extract_highlighted_paragraphs(pdf_path: Path, parse_cache: ParseCache | None = None) -> list[HighlightedParagraph]:
     highlights: list[HighlightedParagraph] = []
     seen: set[str] = set()
+    # Page context comes from the paper's parse sidecar when it was indexed with
+    # these exact bytes; annotations and text blocks still need the PDF itself.
+    sidecar = parse_cache.open(file_sha256(pdf_path)) if parse_cache is not None else None
+    contexts: dict[int, str] = {}
+
+    def page_context(page: fitz.Page, page_index: int) -> str:
+        if page_index not in contexts:
+            if sidecar is not None and page_index < sidecar.stored_pages:
+                text = sidecar.page_text(page_index)
+            else:
+                text = page.get_text("text")
+            contexts[page_index] = " ".join(text.split())[:1800]
+        return contexts[page_index]
 
-    with fitz.open(pdf_path) as doc:
-        for page_index in range(len(doc)):
-            page = doc[page_index]
-            annotation = page.first_annot
-            while annotation:
-                if annotation.type[1] == "Highlight":
-                    paragraph = _paragraph_from_blocks(page, annotation.rect)
-                    paragraph = " ".join(paragraph.split())
-                    if paragraph and paragraph not in seen:
-                        seen.add(paragraph)
-                        page_context = " ".join(page.get_text("text").split())
-                        highlights.append(
-                            HighlightedParagraph(
-                                page=page_index + 1,
-                                text=paragraph,
-                                context=page_context[:1800],
+    try:
+        with fitz.open(pdf_path) as doc:
+            for page_index in range(len(doc)):
+                page = doc[page_index]
+                annotation = page.first_annot
+                while annotation:
+                    if annotation.type[1] == "Highlight":
+                        paragraph = _paragraph_from_blocks(page, annotation.rect)
+                        paragraph = " ".join(paragraph.split())
+                        if paragraph and paragraph not in seen:
+                            seen.add(paragraph)
+                            highlights.append(
+                                HighlightedParagraph(
+                                    page=page_index + 1,
+                                    text=paragraph,
+                                    context=page_context(page, page_index),
+                                )
                             )
-                        )
-                annotation = annotation.next
+                    annotation = annotation.next
+    finally:
+        if sidecar is not None:
+            sidecar.close()
     return highlights
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+
+# Durable per-hop analysis outputs keyed by (content hash, hop, prompt
+# fingerprint, model). A re-index looks every hop up here first, so editing one
+# prompt only re-runs that hop and the hops that depend on it.
+class HopMemo:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.bypass = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hops ("
+            "content_hash TEXT NOT NULL, hop TEXT NOT NULL, fingerprint TEXT NOT NULL, model TEXT NOT NULL, "
+            "output BLOB NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (content_hash, hop, fingerprint, model))"
+        )
+
+    def get(self, content_hash: str, fingerprints: dict[str, str], model: str) -> dict[str, dict[str, Any]]:
+        if self.bypass or not content_hash:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hop, fingerprint, output FROM hops WHERE content_hash = ? AND model = ?",
+                (content_hash, model),
+            ).fetchall()
+        return {
+            hop: json.loads(zlib.decompress(output))
+            for hop, fingerprint, output in rows
+            if fingerprints.get(hop) == fingerprint
+        }
+
+    def count(self, reused: int, total: int) -> None:
+        with self._lock:
+            self.hits += reused
+            self.misses += total - reused
+
+    def put(self, content_hash: str, hop: str, fingerprint: str, model: str, output: dict[str, Any]) -> None:
+        if not content_hash or not output:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hops (content_hash, hop, fingerprint, model, output, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, hop, fingerprint, model, zlib.compress(json.dumps(output).encode("utf-8")), time.time()),
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM hops").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator, Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .limiter import RequestLimiter
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Full jitter keeps concurrent hops from retrying against the server in lockstep.
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def retry_after_seconds(headers: Mapping[str, str], cap: float) -> float | None:
+    try:
+        return min(cap, max(0.0, float(headers.get("Retry-After", ""))))
+    except ValueError:
+        return None
+
+
+class PooledTransport:
+    def __init__(
+        self,
+        pool_size: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 90.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        limiter: RequestLimiter | None = None,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        read_timeout: float | None = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        return self._request(method, url, read_timeout, self.limiter is not None, **kwargs)
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        url: str,
+        read_timeout: float | None = None,
+        **kwargs: Any,
+    ) -> Iterator[requests.Response]:
+        # The limiter slot is held until the body is fully read, not just until headers arrive.
+        with self.limiter if self.limiter is not None else nullcontext():
+            response = self._request(method, url, read_timeout, False, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        read_timeout: float | None,
+        use_limiter: bool,
+        **kwargs: Any,
+    ) -> requests.Response:
+        timeout = (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+        self._count("_requests")
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, url, timeout, use_limiter, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._count("_failures")
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if not response.ok:
+                        self._count("_failures")
+                    return response
+                if attempt >= self.max_retries:
+                    self._count("_failures")
+                    return response
+                delay = retry_after_seconds(response.headers, self.backoff_max) or backoff_delay(
+                    attempt, self.backoff_base, self.backoff_max
+                )
+                response.close()
+            self._count("_retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"requests": self._requests, "retries": self._retries, "failures": self._failures}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        timeout: tuple[float, float],
+        use_limiter: bool,
+        **kwargs: Any,
+    ) -> requests.Response:
+        if not use_limiter or self.limiter is None:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+        with self.limiter:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
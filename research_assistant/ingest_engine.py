@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+
+from .async_llm_client import AsyncLocalLLMClient
+from .models import IndexedPaper, PaperInsight, ParsedPaper
+from .parser import parse_context, parse_pdf
+from .pipeline import IngestionPipeline
+
+
+@dataclass
+class IngestResult:
+    pdf_path: Path
+    message: str
+    ok: bool
+    # Set on failures once the file was hashed, so callers can drop its journal.
+    content_hash: str = ""
+
+
+@dataclass
+class _Job:
+    pdf_path: Path
+    paper_id: str
+    content_hash: str = ""
+    parsed: ParsedPaper | None = None
+    indexed: IndexedPaper | None = None
+    embedding: np.ndarray | None = None
+    # Stage outputs journaled by an earlier, interrupted attempt.
+    state: dict[str, Any] = field(default_factory=dict)
+    # Which parse pool the job was submitted to; pools are replaced when a worker dies.
+    pool_generation: int = 0
+
+
+class StagedIngestionEngine:
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        parse_workers: int = 2,
+        llm_workers: int = 2,
+        embed_batch_size: int = 16,
+        upsert_batch_size: int = 32,
+        async_llm: AsyncLocalLLMClient | None = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.async_llm = async_llm
+        self.parse_workers = max(1, parse_workers)
+        self.llm_workers = max(1, llm_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+
+    def ingest_many(
+        self,
+        pdf_paths: Iterable[Path],
+        force: bool = False,
+        on_result: Callable[[IngestResult], None] | None = None,
+        source: str | None = None,
+    ) -> list[IngestResult]:
+        results: list[IngestResult] = []
+
+        def emit(result: IngestResult) -> None:
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+        pending = self._pending_jobs(list(pdf_paths), force, emit)
+        if not pending:
+            return results
+
+        # Keep a small buffer of parsed documents ahead of the LLM stage without
+        # parsing the whole folder into memory up front.
+        max_buffered = self.parse_workers + 2 * self.llm_workers
+        embed_buffer: list[_Job] = []
+        upsert_buffer: list[_Job] = []
+
+        parse_pool = self._parse_pool()
+        generation = 0
+        try:
+            with self._analysis_runner() as submit_analysis:
+                parse_futures: dict[Future[ParsedPaper], _Job] = {}
+                analysis_futures: dict[Future[PaperInsight], _Job] = {}
+                queue = list(reversed(pending))
+
+                def replace_parse_pool() -> None:
+                    # A worker killed by a crash in PyMuPDF (segfault, OOM) breaks the
+                    # whole pool; start a fresh one for the rest of the batch.
+                    nonlocal parse_pool, generation
+                    parse_pool.shutdown(wait=False, cancel_futures=True)
+                    parse_pool = self._parse_pool()
+                    generation += 1
+
+                def submit_parse(job: _Job) -> None:
+                    args = (
+                        parse_pdf,
+                        job.pdf_path,
+                        self.pipeline.parse_options,
+                        self.pipeline.parse_cache,
+                        job.content_hash,
+                    )
+                    try:
+                        future = parse_pool.submit(*args)
+                    except BrokenProcessPool:
+                        replace_parse_pool()
+                        future = parse_pool.submit(*args)
+                    job.pool_generation = generation
+                    parse_futures[future] = job
+
+                def analyze(job: _Job) -> None:
+                    try:
+                        if "parse" not in job.state:
+                            self.pipeline.journal_record(job.content_hash, "parse", job.parsed)
+                        near_duplicate = None if force else self.pipeline.find_near_duplicate(job.paper_id, job.parsed)
+                        if near_duplicate is not None:
+                            job.indexed = self.pipeline.build_indexed(
+                                job.paper_id, job.pdf_path, job.parsed, near_duplicate[2], source, job.content_hash
+                            )
+                            self.pipeline.link_near_duplicate(job.indexed, near_duplicate)
+                            embed_buffer.append(job)
+                            return
+                        future = submit_analysis(job)
+                    except Exception as exc:
+                        emit(self._failure(job, exc))
+                        return
+                    analysis_futures[future] = job
+
+                while queue or parse_futures or analysis_futures:
+                    while queue and len(parse_futures) + len(analysis_futures) < max_buffered:
+                        job = queue.pop()
+                        job.parsed = self.pipeline.parsed_from_journal(job.state)
+                        if job.parsed is not None:
+                            analyze(job)
+                        else:
+                            submit_parse(job)
+
+                    # Resumed jobs can skip both pools, leaving nothing to wait on.
+                    done = set()
+                    if parse_futures or analysis_futures:
+                        done, _ = wait([*parse_futures, *analysis_futures], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in parse_futures:
+                            job = parse_futures.pop(future)
+                            try:
+                                job.parsed = future.result()
+                            except BrokenProcessPool as exc:
+                                # Every job in flight on the dead pool fails with it; the
+                                # watcher's retry queue gives the innocent ones another go.
+                                if job.pool_generation == generation:
+                                    replace_parse_pool()
+                                emit(self._failure(job, exc))
+                                continue
+                            except Exception as exc:
+                                emit(self._failure(job, exc))
+                                continue
+                            analyze(job)
+                            continue
+
+                        job = analysis_futures.pop(future)
+                        try:
+                            insight = future.result()
+                            job.indexed = self.pipeline.build_indexed(
+                                job.paper_id, job.pdf_path, job.parsed, insight, source, job.content_hash
+                            )
+                        except Exception as exc:
+                            emit(self._failure(job, exc))
+                            continue
+                        embed_buffer.append(job)
+
+                    if len(embed_buffer) >= self.embed_batch_size:
+                        self._flush_embeddings(embed_buffer, upsert_buffer, emit)
+                    if len(upsert_buffer) >= self.upsert_batch_size:
+                        self._flush_upserts(upsert_buffer, force, emit)
+        finally:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+
+        self._flush_embeddings(embed_buffer, upsert_buffer, emit)
+        self._flush_upserts(upsert_buffer, force, emit)
+        return results
+
+    def _pending_jobs(
+        self,
+        pdf_paths: list[Path],
+        force: bool,
+        emit: Callable[[IngestResult], None],
+    ) -> list[_Job]:
+        jobs: list[_Job] = []
+        first_by_id: dict[str, _Job] = {}
+        for path in pdf_paths:
+            try:
+                paper_id, content_hash = self.pipeline.identify(path)
+            except OSError as exc:
+                emit(self._failure(_Job(pdf_path=path, paper_id=""), exc))
+                continue
+            job = _Job(pdf_path=path, paper_id=paper_id, content_hash=content_hash)
+            original = first_by_id.get(paper_id)
+            if original is not None:
+                # Identical bytes under two paths in one batch: analyze once.
+                try:
+                    self.pipeline.record_paths([(path, paper_id, content_hash)])
+                except Exception as exc:
+                    emit(self._failure(job, exc))
+                    continue
+                emit(IngestResult(path, f"Skipped {path.name} (same content as {original.pdf_path.name}).", True))
+                continue
+            first_by_id[paper_id] = job
+            jobs.append(job)
+        try:
+            states = self.pipeline.journal_states([job.content_hash for job in jobs])
+            existing = {} if force else self.pipeline.indexed_matches([(job.pdf_path, job.paper_id) for job in jobs])
+        except Exception as exc:
+            for job in jobs:
+                emit(self._failure(job, exc))
+            return []
+        pending: list[_Job] = []
+        for job in jobs:
+            job.state = states.get(job.content_hash, {})
+            # An unfinished journal means the paper may be upserted but not yet
+            # reported or recorded; resume it rather than skip it.
+            if job.pdf_path not in existing or job.state:
+                pending.append(job)
+                continue
+            try:
+                message = self.pipeline.note_duplicate(job.pdf_path, existing[job.pdf_path], job.content_hash)
+            except Exception as exc:
+                emit(self._failure(job, exc))
+                continue
+            emit(IngestResult(job.pdf_path, message, True))
+        return pending
+
+    def _flush_embeddings(
+        self,
+        embed_buffer: list[_Job],
+        upsert_buffer: list[_Job],
+        emit: Callable[[IngestResult], None],
+    ) -> None:
+        if not embed_buffer:
+            return
+        batch = []
+        for job in embed_buffer:
+            job.embedding = self.pipeline.embedding_from_journal(job.state)
+            if job.embedding is None:
+                batch.append(job)
+            else:
+                upsert_buffer.append(job)
+        embed_buffer.clear()
+        if not batch:
+            return
+        try:
+            vectors = self.pipeline.embedder.embed([self.pipeline.embedding_source(job.indexed) for job in batch])
+        except Exception as exc:
+            for job in batch:
+                emit(self._failure(job, exc))
+            return
+        for job, vector in zip(batch, vectors):
+            job.embedding = vector
+            try:
+                self.pipeline.journal_record(job.content_hash, "embed", vector)
+            except Exception as exc:
+                emit(self._failure(job, exc))
+                continue
+            upsert_buffer.append(job)
+
+    def _flush_upserts(
+        self,
+        upsert_buffer: list[_Job],
+        force: bool,
+        emit: Callable[[IngestResult], None],
+    ) -> None:
+        if not upsert_buffer:
+            return
+        batch = list(upsert_buffer)
+        upsert_buffer.clear()
+        try:
+            self.pipeline.store_indexed(
+                [job.indexed for job in batch],
+                [job.embedding for job in batch],
+                [job.content_hash for job in batch],
+            )
+            self.pipeline.record_paths([(job.pdf_path, job.paper_id, job.content_hash) for job in batch])
+            self.pipeline.journal_finish([job.content_hash for job in batch])
+        except Exception as exc:
+            for job in batch:
+                emit(self._failure(job, exc))
+            return
+        for job in batch:
+            emit(IngestResult(job.pdf_path, self.pipeline.indexed_message(job.pdf_path, force, job.indexed), True))
+
+    @contextmanager
+    def _analysis_runner(self) -> Iterator[Callable[[_Job], Future[PaperInsight]]]:
+        if self.async_llm is None:
+            with ThreadPoolExecutor(max_workers=self.llm_workers) as llm_pool:
+                yield lambda job: llm_pool.submit(self.pipeline.analyze, job.content_hash, job.parsed, job.state)
+            return
+
+        # One event loop drives every paper's hops; llm_workers papers are in
+        # analysis at once and the process-wide limiter, not a thread per
+        # request, bounds what reaches the server.
+        client = self.async_llm
+        slots = asyncio.Semaphore(self.llm_workers)
+
+        async def analyze(job: _Job) -> PaperInsight:
+            async with slots:
+                return await self.pipeline.analyze_async(client, job.content_hash, job.parsed, job.state)
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="ingest-llm", daemon=True)
+        thread.start()
+        try:
+            yield lambda job: asyncio.run_coroutine_threadsafe(analyze(job), loop)
+        finally:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _parse_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=parse_context())
+
+    @staticmethod
+    def _failure(job: _Job, exc: Exception) -> IngestResult:
+        return IngestResult(job.pdf_path, f"Failed to process {job.pdf_path.name}: {exc}", False, job.content_hash)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterable
+
+
+# Write-ahead record of finished ingestion stages, keyed by PDF content hash.
+# Each stage's output is stored as soon as it completes (zlib-compressed JSON),
+# so a crashed watcher or re-index resumes a paper from its last finished stage
+# instead of re-running every hop. Entries are dropped once the paper is fully
+# stored; a paper that failed keeps its entries for the next attempt until it is
+# dead-lettered or has not been touched for STALE_AFTER_SECONDS.
+class IngestJournal:
+    STAGES = ("parse", "stage_one", "summary", "technical", "reasoning", "embed", "upsert", "report")
+    LOOKUP_CHUNK = 500
+    STALE_AFTER_SECONDS = 30 * 24 * 3600
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            "content_hash TEXT NOT NULL, stage TEXT NOT NULL, output BLOB NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (content_hash, stage))"
+        )
+        self.prune_stale()
+
+    def record(self, content_hash: str, stage: str, output: Any = None) -> None:
+        self.record_many([(content_hash, stage, output)])
+
+    def record_many(self, entries: Iterable[tuple[str, str, Any]]) -> None:
+        now = time.time()
+        rows = [
+            (content_hash, stage, zlib.compress(json.dumps(output).encode("utf-8")), now)
+            for content_hash, stage, output in entries
+        ]
+        if not rows:
+            return
+        # The connection block commits, or rolls back if a write fails, so one
+        # failed write cannot leave the journal stuck inside a transaction.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stages (content_hash, stage, output, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def load(self, content_hash: str) -> dict[str, Any]:
+        return self.load_many([content_hash]).get(content_hash, {})
+
+    def load_many(self, content_hashes: Iterable[str]) -> dict[str, dict[str, Any]]:
+        wanted = list(dict.fromkeys(content_hashes))
+        found: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            for start in range(0, len(wanted), self.LOOKUP_CHUNK):
+                chunk = wanted[start : start + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT content_hash, stage, output FROM stages WHERE content_hash IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for content_hash, stage, output in rows:
+                    found.setdefault(content_hash, {})[stage] = json.loads(zlib.decompress(output))
+        return found
+
+    def finish(self, content_hashes: Iterable[str]) -> None:
+        rows = [(content_hash,) for content_hash in dict.fromkeys(content_hashes) if content_hash]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM stages WHERE content_hash = ?", rows)
+
+    def prune_stale(self) -> int:
+        # Papers abandoned after a failure would otherwise keep their stage
+        # outputs (full text included) forever.
+        cutoff = time.time() - self.STALE_AFTER_SECONDS
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM stages WHERE content_hash IN "
+                "(SELECT content_hash FROM stages GROUP BY content_hash HAVING MAX(updated_at) < ?)",
+                (cutoff,),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            papers = self._conn.execute("SELECT COUNT(DISTINCT content_hash) FROM stages").fetchone()[0]
+            rows = self._conn.execute("SELECT stage, COUNT(*) FROM stages GROUP BY stage").fetchall()
+        return {"unfinished_papers": papers, "stages": {stage: count for stage, count in rows}}
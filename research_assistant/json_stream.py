@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+# Decodes one string field of a JSON object while the object is still streaming in,
+# so partial text can be shown before the model finishes the whole answer.
+class JSONStringFieldStreamer:
+    def __init__(self, field: str) -> None:
+        self._key_pattern = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._cursor: int | None = None
+        self.value = ""
+        self.complete = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self.complete:
+            return ""
+        if self._cursor is None:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                return ""
+            self._cursor = match.end()
+
+        decoded: list[str] = []
+        buffer = self._buffer
+        cursor = self._cursor
+        while cursor < len(buffer):
+            char = buffer[cursor]
+            if char == '"':
+                self.complete = True
+                cursor += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                cursor += 1
+                continue
+            if cursor + 1 >= len(buffer):
+                break
+            escape = buffer[cursor + 1]
+            if escape == "u":
+                code, consumed = _decode_unicode_escape(buffer, cursor)
+                if consumed == 0:
+                    break
+                decoded.append(code)
+                cursor += consumed
+                continue
+            decoded.append(_SIMPLE_ESCAPES.get(escape, escape))
+            cursor += 2
+
+        self._cursor = cursor
+        delta = "".join(decoded)
+        self.value += delta
+        return delta
+
+
+def _decode_unicode_escape(buffer: str, cursor: int) -> tuple[str, int]:
+    hex_digits = buffer[cursor + 2 : cursor + 6]
+    if len(hex_digits) < 4:
+        return "", 0
+    try:
+        code = int(hex_digits, 16)
+    except ValueError:
+        return hex_digits, 6
+    if 0xD800 <= code < 0xDC00:
+        # High surrogate: wait for the low half so we never emit a lone surrogate.
+        low = buffer[cursor + 6 : cursor + 12]
+        if len(low) < 6:
+            return "", 0
+        if low.startswith("\\u"):
+            try:
+                low_code = int(low[2:], 16)
+            except ValueError:
+                low_code = 0
+            if 0xDC00 <= low_code < 0xE000:
+                return chr(0x10000 + ((code - 0xD800) << 10) + (low_code - 0xDC00)), 12
+        return "\ufffd", 6
+    return chr(code), 6
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: reads, appends and compaction are only serialised within a process.
+    fcntl = None
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+# BM25 over paper ids. The compacted base segment is a set of .npy files opened
+# with mmap, so a Streamlit restart maps the index instead of rebuilding it; new
+# upserts are appended to a JSONL delta that is replayed on load and folded into
+# a fresh base generation once it grows past `compact_after` documents.
+class LexicalIndex:
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, directory: Path, compact_after: int = 256) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compact_after = max(1, compact_after)
+        self._lock = threading.Lock()
+        self._manifest_path = self.directory / "manifest.json"
+        self._writer_lock_path = self.directory / "writer.lock"
+        self._writing = False
+        self._manifest_mtime = -1
+        self._generation = 0
+        self._delta_offset = 0
+        self._reset_base()
+        self._reset_delta()
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._base_live.sum()) + len(self._delta_docs)
+
+    def upsert(self, documents: dict[str, str]) -> None:
+        if not documents:
+            return
+        lines = []
+        for doc_id, text in documents.items():
+            tokens = tokenize(text)
+            lines.append(json.dumps({"id": doc_id, "length": len(tokens), "terms": Counter(tokens)}))
+        with self._lock, self._writer():
+            self._refresh()
+            with self._delta_path(self._generation).open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+            self._refresh()
+            if len(self._delta_docs) >= self.compact_after:
+                self._compact()
+
+    def remove(self, doc_ids: list[str]) -> None:
+        if not doc_ids:
+            return
+        lines = [json.dumps({"id": doc_id, "deleted": True}) for doc_id in doc_ids]
+        with self._lock, self._writer():
+            self._refresh()
+            with self._delta_path(self._generation).open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+            self._refresh()
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._refresh()
+            live_base = int(self._base_live.sum())
+            doc_count = live_base + len(self._delta_docs)
+            if not terms or doc_count == 0:
+                return []
+            total_length = float(self._base_lengths[self._base_live].sum()) + sum(
+                length for length, _ in self._delta_docs.values()
+            )
+            avg_length = max(total_length / doc_count, 1.0)
+
+            base_scores = np.zeros(len(self._base_ids), dtype=np.float32)
+            delta_scores: dict[str, float] = {}
+            for term in terms:
+                span = self._base_terms.get(term)
+                if span is not None:
+                    start, count = span
+                    docs = np.asarray(self._base_docs[start : start + count])
+                    freqs = np.asarray(self._base_freqs[start : start + count], dtype=np.float32)
+                    live = self._base_live[docs]
+                    docs, freqs = docs[live], freqs[live]
+                else:
+                    docs = np.empty(0, dtype=np.int32)
+                    freqs = np.empty(0, dtype=np.float32)
+                delta_postings = self._delta_postings.get(term, {})
+
+                doc_freq = len(docs) + len(delta_postings)
+                if doc_freq == 0:
+                    continue
+                idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+                if len(docs):
+                    norm = self.K1 * (1 - self.B + self.B * self._base_lengths[docs] / avg_length)
+                    base_scores[docs] += idf * freqs * (self.K1 + 1) / (freqs + norm)
+                for doc_id, freq in delta_postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._delta_docs[doc_id][0] / avg_length)
+                    delta_scores[doc_id] = delta_scores.get(doc_id, 0.0) + idf * freq * (self.K1 + 1) / (freq + norm)
+
+            candidates = list(delta_scores.items())
+            matched = np.flatnonzero(base_scores)
+            if len(matched) > limit:
+                matched = matched[np.argpartition(-base_scores[matched], limit - 1)[:limit]]
+            candidates.extend((self._base_ids[index], float(base_scores[index])) for index in matched)
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return [(doc_id, round(score, 4)) for doc_id, score in candidates[:limit]]
+
+    def compact(self) -> None:
+        with self._lock, self._writer():
+            self._refresh()
+            self._compact()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "generation": self._generation,
+                "base_documents": int(self._base_live.sum()),
+                "delta_documents": len(self._delta_docs),
+                "terms": len(self._base_terms),
+            }
+
+    @contextlib.contextmanager
+    def _writer(self) -> Iterator[None]:
+        # The watcher and the Streamlit app write the same directory from separate
+        # processes. Holding an exclusive flock from the refresh before an append
+        # through compaction means no process appends to a delta generation that
+        # another is about to fold into a new base and unlink.
+        with self._flock(shared=False):
+            self._writing = True
+            try:
+                yield
+            finally:
+                self._writing = False
+
+    @contextlib.contextmanager
+    def _flock(self, shared: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with self._writer_lock_path.open("a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _delta_path(self, generation: int) -> Path:
+        return self.directory / f"delta-{generation}.jsonl"
+
+    def _segment_path(self, generation: int, name: str) -> Path:
+        return self.directory / f"base-{generation}.{name}"
+
+    def _reset_base(self) -> None:
+        self._base_ids: list[str] = []
+        self._base_positions: dict[str, int] = {}
+        self._base_terms: dict[str, list[int]] = {}
+        self._base_lengths = np.empty(0, dtype=np.int32)
+        self._base_docs = np.empty(0, dtype=np.int32)
+        self._base_freqs = np.empty(0, dtype=np.uint16)
+        self._base_live = np.empty(0, dtype=bool)
+
+    def _reset_delta(self) -> None:
+        self._delta_docs: dict[str, tuple[int, dict[str, int]]] = {}
+        self._delta_postings: dict[str, dict[str, int]] = {}
+        self._delta_offset = 0
+
+    def _refresh(self) -> None:
+        # The watcher and the Streamlit app share one index directory, so pick up
+        # a newer base generation or delta lines written by the other process.
+        # Loading holds the lock shared, so a compaction elsewhere cannot unlink
+        # the generation mid-load; a writer already holds it exclusively (flock
+        # locks are per open file, so asking again would deadlock).
+        if self._writing:
+            self._refresh_files()
+            return
+        with self._flock(shared=True):
+            self._refresh_files()
+
+    def _refresh_files(self) -> None:
+        try:
+            mtime = self._manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            self._load_base()
+        self._read_delta()
+
+    def _load_base(self) -> None:
+        self._reset_base()
+        self._reset_delta()
+        self._generation = 0
+        if not self._manifest_path.exists():
+            return
+        manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        self._generation = int(manifest["generation"])
+        if not manifest.get("documents"):
+            return
+        self._base_ids = json.loads(self._segment_path(self._generation, "ids.json").read_text(encoding="utf-8"))
+        self._base_positions = {doc_id: index for index, doc_id in enumerate(self._base_ids)}
+        self._base_terms = json.loads(self._segment_path(self._generation, "terms.json").read_text(encoding="utf-8"))
+        self._base_lengths = np.load(self._segment_path(self._generation, "lengths.npy"), mmap_mode="r")
+        self._base_docs = np.load(self._segment_path(self._generation, "docs.npy"), mmap_mode="r")
+        self._base_freqs = np.load(self._segment_path(self._generation, "freqs.npy"), mmap_mode="r")
+        self._base_live = np.ones(len(self._base_ids), dtype=bool)
+
+    def _read_delta(self) -> None:
+        path = self._delta_path(self._generation)
+        if not path.exists() or path.stat().st_size <= self._delta_offset:
+            return
+        with path.open("rb") as handle:
+            handle.seek(self._delta_offset)
+            chunk = handle.read()
+        # Only consume whole lines; a concurrent writer may be mid-append.
+        complete = chunk[: chunk.rfind(b"\n") + 1]
+        self._delta_offset += len(complete)
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("deleted"):
+                    self._apply_removal(entry["id"])
+                else:
+                    self._apply_delta(entry["id"], int(entry["length"]), entry["terms"])
+
+    def _apply_removal(self, doc_id: str) -> None:
+        previous = self._delta_docs.pop(doc_id, None)
+        if previous is not None:
+            for term in previous[1]:
+                self._delta_postings[term].pop(doc_id, None)
+        position = self._base_positions.get(doc_id)
+        if position is not None:
+            self._base_live[position] = False
+
+    def _apply_delta(self, doc_id: str, length: int, terms: dict[str, int]) -> None:
+        self._apply_removal(doc_id)
+        self._delta_docs[doc_id] = (length, terms)
+        for term, freq in terms.items():
+            self._delta_postings.setdefault(term, {})[doc_id] = freq
+
+    def _compact(self) -> None:
+        live_positions = np.flatnonzero(self._base_live)
+        remap = np.full(len(self._base_ids), -1, dtype=np.int64)
+        remap[live_positions] = np.arange(len(live_positions))
+        delta_ids = list(self._delta_docs)
+        ids = [self._base_ids[index] for index in live_positions] + delta_ids
+        delta_positions = {doc_id: len(live_positions) + offset for offset, doc_id in enumerate(delta_ids)}
+        lengths = np.concatenate(
+            [
+                np.asarray(self._base_lengths, dtype=np.int32)[live_positions],
+                np.asarray([self._delta_docs[doc_id][0] for doc_id in delta_ids], dtype=np.int32),
+            ]
+        )
+
+        terms: dict[str, list[int]] = {}
+        doc_parts: list[np.ndarray] = []
+        freq_parts: list[np.ndarray] = []
+        offset = 0
+        for term in sorted(set(self._base_terms) | set(self._delta_postings)):
+            docs = np.empty(0, dtype=np.int64)
+            freqs = np.empty(0, dtype=np.uint16)
+            span = self._base_terms.get(term)
+            if span is not None:
+                start, count = span
+                base_docs = remap[np.asarray(self._base_docs[start : start + count])]
+                keep = base_docs >= 0
+                docs = base_docs[keep]
+                freqs = np.asarray(self._base_freqs[start : start + count])[keep]
+            postings = self._delta_postings.get(term, {})
+            if postings:
+                docs = np.concatenate([docs, [delta_positions[doc_id] for doc_id in postings]])
+                freqs = np.concatenate([freqs, np.minimum(list(postings.values()), 65535).astype(np.uint16)])
+            if not len(docs):
+                continue
+            terms[term] = [offset, len(docs)]
+            doc_parts.append(docs.astype(np.int32))
+            freq_parts.append(freqs.astype(np.uint16))
+            offset += len(docs)
+
+        generation = self._generation + 1
+        self._segment_path(generation, "ids.json").write_text(json.dumps(ids), encoding="utf-8")
+        self._segment_path(generation, "terms.json").write_text(json.dumps(terms), encoding="utf-8")
+        np.save(self._segment_path(generation, "lengths.npy"), lengths)
+        np.save(
+            self._segment_path(generation, "docs.npy"),
+            np.concatenate(doc_parts) if doc_parts else np.empty(0, dtype=np.int32),
+        )
+        np.save(
+            self._segment_path(generation, "freqs.npy"),
+            np.concatenate(freq_parts) if freq_parts else np.empty(0, dtype=np.uint16),
+        )
+        self._delta_path(generation).touch()
+
+        temp_manifest = self._manifest_path.with_suffix(".tmp")
+        temp_manifest.write_text(json.dumps({"generation": generation, "documents": len(ids)}), encoding="utf-8")
+        os.replace(temp_manifest, self._manifest_path)
+
+        previous = self._generation
+        self._manifest_mtime = -1
+        self._refresh()
+        # Open mmaps of the old generation stay valid after unlink on POSIX; on
+        # Windows the files are left behind until the next compaction.
+        for path in [*self.directory.glob(f"base-{previous}.*"), self._delta_path(previous)]:
+            with contextlib.suppress(OSError):
+                path.unlink()
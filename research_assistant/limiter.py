@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from types import TracebackType
+
+
+class RequestLimiter:
+    def __init__(self, max_in_flight: int) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self._semaphore = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._loop_gates: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def acquire(self) -> None:
+        self._semaphore.acquire()
+        self._entered()
+
+    async def acquire_async(self) -> None:
+        # The threading semaphore is shared by every thread and event loop in the
+        # process. Tasks first queue on a per-loop asyncio semaphore, so at most
+        # max_in_flight of them per loop wait on the shared one in an executor
+        # thread; the rest sleep on the loop without holding a thread.
+        gate = self._loop_gate()
+        await gate.acquire()
+        try:
+            if not self._semaphore.acquire(blocking=False):
+                waiter = asyncio.get_running_loop().run_in_executor(None, self._semaphore.acquire)
+                try:
+                    await asyncio.shield(waiter)
+                except asyncio.CancelledError:
+                    # The executor thread still takes the slot; hand it back when it does.
+                    waiter.add_done_callback(lambda _: self._semaphore.release())
+                    raise
+        except BaseException:
+            gate.release()
+            raise
+        self._entered()
+
+    def release_async(self) -> None:
+        self.release()
+        self._loop_gate().release()
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+            }
+
+    def __enter__(self) -> RequestLimiter:
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.release()
+
+    async def __aenter__(self) -> RequestLimiter:
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.release_async()
+
+    def _loop_gate(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            gate = self._loop_gates.get(loop)
+            if gate is None:
+                gate = self._loop_gates[loop] = asyncio.Semaphore(self.max_in_flight)
+            return gate
+
+    def _entered(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+
+_GLOBAL_LIMITER: RequestLimiter | None = None
+_GLOBAL_LOCK = threading.Lock()
+
+
+def get_request_limiter(max_in_flight: int) -> RequestLimiter:
+    # One limiter per process; the first caller decides its size.
+    global _GLOBAL_LIMITER
+    with _GLOBAL_LOCK:
+        if _GLOBAL_LIMITER is None:
+            _GLOBAL_LIMITER = RequestLimiter(max_in_flight)
+        return _GLOBAL_LIMITER
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+
+class LLMResponseCache:
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, path: Path, max_bytes: int, enabled: bool = True, bypass: bool = False) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        if enabled:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+                # Several processes (watcher, Streamlit, re-index) write this file, so
+                # the byte total lives in the database and every writer updates it in
+                # its own transaction instead of keeping a per-process count.
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS usage ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO usage (id, total_bytes) SELECT 0, COALESCE(SUM(size), 0) FROM responses"
+                )
+
+    @staticmethod
+    def build_key(
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        raw = json.dumps([model, system_prompt, user_prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if self._conn is None or self.bypass:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return str(row[0])
+
+    def put(self, key: str, response: str) -> None:
+        if self._conn is None:
+            return
+        size = len(response.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            total = self._add_bytes(size - (int(previous[0]) if previous else 0))
+            if total > self.max_bytes:
+                self._evict(total)
+
+    def discard(self, key: str) -> None:
+        if self._conn is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._add_bytes(-int(row[0]))
+
+    def clear(self) -> None:
+        if self._conn is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("UPDATE usage SET total_bytes = 0 WHERE id = 0")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        size_bytes = 0
+        if self._conn is not None:
+            with self._lock:
+                size_bytes = self._total_bytes()
+        return {
+            "enabled": self.enabled,
+            "bypass": self.bypass,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _total_bytes(self) -> int:
+        return int(self._conn.execute("SELECT total_bytes FROM usage WHERE id = 0").fetchone()[0])
+
+    def _add_bytes(self, delta: int) -> int:
+        self._conn.execute("UPDATE usage SET total_bytes = MAX(total_bytes + ?, 0) WHERE id = 0", (delta,))
+        return self._total_bytes()
+
+    def _evict(self, total: int) -> None:
+        target = int(self.max_bytes * self.EVICTION_TARGET)
+        while total > target:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC LIMIT 256").fetchall()
+            if not rows:
+                self._conn.execute("UPDATE usage SET total_bytes = 0 WHERE id = 0")
+                return
+            freed = 0
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                freed += int(size)
+                self.evictions += 1
+                if total - freed <= target:
+                    break
+            total = self._add_bytes(-freed)
@@ -1,94 +1,23 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import re
-from typing import Any
-
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator
 
 from .config import Settings
+from .http_transport import PooledTransport
+from .json_stream import JSONStringFieldStreamer
+from .limiter import get_request_limiter
+from .llm_cache import LLMResponseCache
 from .models import PaperInsight, ParsedPaper
+from .parser import LazyParsedPaper, context_windows
 
 
-class LocalLLMClient:
-    INPUT_TOKEN_BUDGET = 3900
-
-    def __init__(self, settings: Settings) -> None:
-        self.settings = settings
-
-    def _chat(self, prompt: str) -> str:
-        url = f"{self.settings.llm_api_base.rstrip('/')}/chat/completions"
-        payload: dict[str, Any] = {
-            "model": self.settings.llm_model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a research assistant. Return concise, accurate analysis in JSON only."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.2,
-            "max_tokens": 1200,
-        }
-        headers = {
-            "Authorization": f"Bearer {self.settings.llm_api_key}",
-            "Content-Type": "application/json",
-        }
-        response = requests.post(url, json=payload, headers=headers, timeout=90)
-        response.raise_for_status()
-        body = response.json()
-        return body["choices"][0]["message"]["content"]
-
-    def check_server(self) -> dict[str, Any]:
-        base = self.settings.llm_api_base.rstrip("/")
-        headers = {
-            "Authorization": f"Bearer {self.settings.llm_api_key}",
-            "Content-Type": "application/json",
-        }
-        result: dict[str, Any] = {
-            "ok": False,
-            "base_url": base,
-            "model": self.settings.llm_model,
-            "models_endpoint": f"{base}/models",
-            "chat_endpoint": f"{base}/chat/completions",
-        }
-        try:
-            models_resp = requests.get(f"{base}/models", headers=headers, timeout=15)
-            result["models_status_code"] = models_resp.status_code
-            if models_resp.ok:
-                data = models_resp.json()
-                available = [item.get("id", "") for item in data.get("data", [])]
-                result["available_models"] = available
-            else:
-                result["models_error"] = models_resp.text[:300]
-        except Exception as exc:
-            result["models_error"] = str(exc)
-
-        try:
-            _ = self._chat("Return exactly: OK")
-            result["chat_ok"] = True
-        except Exception as exc:
-            result["chat_ok"] = False
-            result["chat_error"] = str(exc)
-
-        target_model = self.settings.llm_model
-        available_models = result.get("available_models", [])
-        model_known = (not available_models) or (target_model in available_models)
-        result["model_found"] = model_known
-        result["ok"] = bool(result.get("chat_ok")) and model_known
-        return result
-
-    def analyze_paper(self, parsed: ParsedPaper) -> PaperInsight:
-        eq_sample = "\n".join(parsed.equation_candidates[:20])
-        text_chunks = self._build_text_chunks(parsed.full_text, max_chunk_chars=2200)
-        chunk_context = "\n\n".join(
-            f"[Chunk {index + 1}/{len(text_chunks)}]\n{chunk}"
-            for index, chunk in enumerate(text_chunks[:3])
-        )
-
-        stage_one_prompt = f"""
+# Hop prompt templates. Their text feeds each hop's fingerprint, so editing a
+# template invalidates the memoized outputs of that hop and every hop after it.
+STAGE_ONE_TEMPLATE = """
 You are performing step 1 of a multi-hop paper analysis.
 First, build a concise global understanding of the paper.
 
@@ -103,14 +32,10 @@ Paper context:
 
 Equation candidates:
 {eq_sample}
-""".strip()
+"""
 
-        stage_one = self._chat_json(stage_one_prompt)
-        overview = str(stage_one.get("paper_overview", "")).strip()
-        method_type = str(stage_one.get("method_type", "other")).strip() or "other"
-        key_claims = stage_one.get("key_claims", []) or []
-
-        stage_two_summary_prompt = f"""
+STAGE_TWO_TEMPLATES = {
+    "summary": """
 You are performing step 2A of a multi-hop paper analysis.
 Use the paper overview and source text to extract summary-level sections.
 
@@ -123,15 +48,12 @@ Paper overview:
 {overview}
 
 Key claims:
-{chr(10).join(f"- {str(item)}" for item in key_claims[:8])}
+{key_claims}
 
 Paper context:
 {chunk_context}
-""".strip()
-
-        stage_two_summary = self._chat_json(stage_two_summary_prompt)
-
-        stage_two_technical_prompt = f"""
+""",
+    "technical": """
 You are performing step 2B of a multi-hop paper analysis.
 Focus on technical internals.
 
@@ -150,11 +72,8 @@ Equation candidates:
 
 Paper context:
 {chunk_context}
-""".strip()
-
-        stage_two_technical = self._chat_json(stage_two_technical_prompt)
-
-        stage_two_reasoning_prompt = f"""
+""",
+    "reasoning": """
 You are performing step 2C of a multi-hop paper analysis.
 Generate critique and forward-looking research direction.
 
@@ -172,9 +91,267 @@ Method type:
 
 Paper context:
 {chunk_context}
-""".strip()
+""",
+}
+
+
+class LocalLLMClient:
+    INPUT_TOKEN_BUDGET = 3900
+    SYSTEM_PROMPT = "You are a research assistant. Return concise, accurate analysis in JSON only."
+    TEMPERATURE = 0.2
+    MAX_TOKENS = 1200
+    # Template edits change a hop's fingerprint on their own; bump a version for
+    # changes the template text does not show (e.g. how the paper context is built).
+    PROMPT_VERSIONS = {"stage_one": 2, "summary": 1, "technical": 1, "reasoning": 1}
 
-        stage_two_reasoning = self._chat_json(stage_two_reasoning_prompt)
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.cache = LLMResponseCache(
+            settings.data_dir / "llm_cache.sqlite3",
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            enabled=settings.llm_cache_enabled,
+        )
+        self.limiter = get_request_limiter(settings.llm_max_in_flight)
+        self.transport = PooledTransport(
+            pool_size=settings.llm_pool_size,
+            connect_timeout=settings.llm_connect_timeout,
+            read_timeout=settings.llm_timeout,
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_retry_backoff,
+            limiter=self.limiter,
+        )
+
+    @classmethod
+    def hop_fingerprints(cls) -> dict[str, str]:
+        def digest(*parts: object) -> str:
+            return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+        stage_one = digest(
+            cls.SYSTEM_PROMPT,
+            cls.TEMPERATURE,
+            cls.MAX_TOKENS,
+            cls.INPUT_TOKEN_BUDGET,
+            cls.PROMPT_VERSIONS["stage_one"],
+            STAGE_ONE_TEMPLATE,
+        )
+        fingerprints = {"stage_one": stage_one}
+        for name, template in STAGE_TWO_TEMPLATES.items():
+            # Stage-two hops read hop 1's output, so they inherit its fingerprint.
+            fingerprints[name] = digest(stage_one, cls.PROMPT_VERSIONS[name], template)
+        return fingerprints
+
+    @classmethod
+    def prompt_version(cls) -> str:
+        return ",".join(f"{hop}:{fingerprint}" for hop, fingerprint in cls.hop_fingerprints().items())
+
+    def _cache_key(self, prompt: str) -> str:
+        return self.cache.build_key(
+            self.settings.llm_model, self.SYSTEM_PROMPT, prompt, self.TEMPERATURE, self.MAX_TOKENS
+        )
+
+    def _chat(self, prompt: str, use_cache: bool = True) -> str:
+        cache_key = self._cache_key(prompt) if use_cache else ""
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        url = f"{self.settings.llm_api_base.rstrip('/')}/chat/completions"
+        payload = self._chat_payload(self.settings.llm_model, prompt)
+        response = self.transport.post(url, json=payload, headers=self._headers(self.settings))
+        response.raise_for_status()
+        body = response.json()
+        content = body["choices"][0]["message"]["content"]
+        if use_cache:
+            self.cache.put(cache_key, content)
+        return content
+
+    def _chat_stream(self, prompt: str) -> Iterator[str]:
+        cache_key = self._cache_key(prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        url = f"{self.settings.llm_api_base.rstrip('/')}/chat/completions"
+        payload = self._chat_payload(self.settings.llm_model, prompt)
+        payload["stream"] = True
+        parts: list[str] = []
+        with self.transport.stream("POST", url, json=payload, headers=self._headers(self.settings)) as response:
+            response.raise_for_status()
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                # Some servers ignore stream=true and answer with a regular completion.
+                content = response.json()["choices"][0]["message"]["content"]
+                parts.append(content)
+                yield content
+            else:
+                for delta in self._iter_sse_deltas(response.iter_lines(decode_unicode=True)):
+                    parts.append(delta)
+                    yield delta
+        self.cache.put(cache_key, "".join(parts))
+
+    @staticmethod
+    def _iter_sse_deltas(lines: Iterator[str]) -> Iterator[str]:
+        for line in lines:
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                return
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            for choice in event.get("choices") or []:
+                delta = choice.get("delta") or choice.get("message") or {}
+                content = delta.get("content")
+                if content:
+                    yield content
+
+    @classmethod
+    def _chat_payload(cls, model: str, prompt: str) -> dict[str, Any]:
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": cls.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": cls.TEMPERATURE,
+            "max_tokens": cls.MAX_TOKENS,
+        }
+
+    @staticmethod
+    def _headers(settings: Settings) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {settings.llm_api_key}",
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _server_summary(settings: Settings, result: dict[str, Any]) -> dict[str, Any]:
+        target_model = settings.llm_model
+        available_models = result.get("available_models", [])
+        model_known = (not available_models) or (target_model in available_models)
+        result["model_found"] = model_known
+        result["ok"] = bool(result.get("chat_ok")) and model_known
+        return result
+
+    def check_server(self) -> dict[str, Any]:
+        base = self.settings.llm_api_base.rstrip("/")
+        headers = self._headers(self.settings)
+        result: dict[str, Any] = {
+            "ok": False,
+            "base_url": base,
+            "model": self.settings.llm_model,
+            "models_endpoint": f"{base}/models",
+            "chat_endpoint": f"{base}/chat/completions",
+        }
+        try:
+            models_resp = self.transport.get(f"{base}/models", headers=headers, read_timeout=15)
+            result["models_status_code"] = models_resp.status_code
+            if models_resp.ok:
+                data = models_resp.json()
+                available = [item.get("id", "") for item in data.get("data", [])]
+                result["available_models"] = available
+            else:
+                result["models_error"] = models_resp.text[:300]
+        except Exception as exc:
+            result["models_error"] = str(exc)
+
+        try:
+            _ = self._chat("Return exactly: OK", use_cache=False)
+            result["chat_ok"] = True
+        except Exception as exc:
+            result["chat_ok"] = False
+            result["chat_error"] = str(exc)
+
+        self._server_summary(self.settings, result)
+        result["llm_cache"] = self.cache.stats()
+        result["transport"] = self.transport.stats()
+        result["limiter"] = self.limiter.stats()
+        return result
+
+    def analyze_paper(
+        self,
+        parsed: ParsedPaper,
+        completed_hops: dict[str, dict[str, Any]] | None = None,
+        on_hop: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> PaperInsight:
+        # completed_hops carries outputs journaled by an interrupted run; only the
+        # missing hops are sent to the server, and on_hop sees each new result.
+        completed = completed_hops or {}
+        context = self._paper_context(parsed)
+        stage_one = completed.get("stage_one")
+        if not stage_one:
+            stage_one = self._chat_json(self._stage_one_prompt(context))
+            if stage_one and on_hop is not None:
+                on_hop("stage_one", stage_one)
+        # Hops 2A/2B/2C only depend on hop 1, so they can share the server's parallel slots.
+        prompts = self._stage_two_prompts(stage_one, context)
+        stage_two = {name: completed[name] for name in prompts if completed.get(name)}
+        pending = {name: prompt for name, prompt in prompts.items() if name not in stage_two}
+        stage_two.update(self._run_hops(pending, on_hop))
+        return self._assemble_insight(parsed, stage_one, stage_two)
+
+    def explain_highlight(
+        self,
+        highlight_text: str,
+        related_concepts: list[str],
+        expertise_level: str = "ML researcher",
+        include_simplified: bool = False,
+        on_partial_explanation: Callable[[str], None] | None = None,
+    ) -> dict[str, Any]:
+        prompt = self._highlight_prompt(highlight_text, related_concepts, expertise_level, include_simplified)
+        if on_partial_explanation is None:
+            payload = self._chat_json(prompt)
+        else:
+            payload = self._chat_json_stream(prompt, "expert_explanation", on_partial_explanation)
+        return self._highlight_result(payload, related_concepts, include_simplified)
+
+    @classmethod
+    def _paper_context(cls, parsed: ParsedPaper | LazyParsedPaper) -> dict[str, str]:
+        # Lazy papers only read the pages behind the three windows and the first equations.
+        text_chunks = context_windows(parsed, 2200)
+        if isinstance(parsed, LazyParsedPaper):
+            equations = parsed.leading_equations(20)
+        else:
+            equations = parsed.equation_candidates[:20]
+        return {
+            "eq_sample": "\n".join(equations),
+            "chunk_context": "\n\n".join(
+                f"[Chunk {index + 1}/{len(text_chunks)}]\n{chunk}"
+                for index, chunk in enumerate(text_chunks[:3])
+            ),
+        }
+
+    @staticmethod
+    def _stage_one_prompt(context: dict[str, str]) -> str:
+        return STAGE_ONE_TEMPLATE.format(**context).strip()
+
+    @staticmethod
+    def _stage_two_prompts(stage_one: dict[str, Any], context: dict[str, str]) -> dict[str, str]:
+        key_claims = stage_one.get("key_claims", []) or []
+        values = {
+            **context,
+            "overview": str(stage_one.get("paper_overview", "")).strip(),
+            "method_type": str(stage_one.get("method_type", "other")).strip() or "other",
+            "key_claims": "\n".join(f"- {str(item)}" for item in key_claims[:8]),
+        }
+        return {name: template.format(**values).strip() for name, template in STAGE_TWO_TEMPLATES.items()}
+
+    @classmethod
+    def _assemble_insight(
+        cls,
+        parsed: ParsedPaper,
+        stage_one: dict[str, Any],
+        stage_two: dict[str, dict[str, Any]],
+    ) -> PaperInsight:
+        overview = str(stage_one.get("paper_overview", "")).strip()
+        method_type = str(stage_one.get("method_type", "other")).strip() or "other"
+        key_claims = stage_one.get("key_claims", []) or []
+        stage_two_summary = stage_two.get("summary", {})
+        stage_two_technical = stage_two.get("technical", {})
+        stage_two_reasoning = stage_two.get("reasoning", {})
 
         parsed_json = {
             "summary": stage_two_summary.get("summary", overview),
@@ -189,7 +366,7 @@ Paper context:
             "research_ideas": stage_two_reasoning.get("research_ideas", []),
         }
         if not any(parsed_json.values()):
-            parsed_json = self._fallback_analysis(parsed)
+            parsed_json = cls._fallback_analysis(parsed)
 
         contributions = parsed_json.get("contributions") or []
         innovations = parsed_json.get("innovations") or []
@@ -217,15 +394,15 @@ Paper context:
             research_ideas=normalized_ideas[:5],
         )
 
-    def explain_highlight(
-        self,
+    @staticmethod
+    def _highlight_prompt(
         highlight_text: str,
         related_concepts: list[str],
-        expertise_level: str = "ML researcher",
-        include_simplified: bool = False,
-    ) -> dict[str, Any]:
+        expertise_level: str,
+        include_simplified: bool,
+    ) -> str:
         concepts_section = "\n".join(f"- {item}" for item in related_concepts[:8]) or "- None"
-        prompt = f"""
+        return f"""
 You are a reading companion for ML papers.
 
 Return strict JSON with keys:
@@ -243,11 +420,13 @@ Related concept context:
 {concepts_section}
 """.strip()
 
-        try:
-            payload = self._chat_json(prompt)
-            if not payload:
-                raise ValueError("Empty JSON payload")
-        except Exception:
+    @staticmethod
+    def _highlight_result(
+        payload: dict[str, Any],
+        related_concepts: list[str],
+        include_simplified: bool,
+    ) -> dict[str, Any]:
+        if not payload:
             payload = {
                 "expert_explanation": (
                     "Unable to generate model explanation reliably. Use related concept matches below "
@@ -266,35 +445,61 @@ Related concept context:
             "related_links": [str(x).strip() for x in payload.get("related_links", []) if str(x).strip()][:6],
         }
 
+    def _run_hops(
+        self,
+        prompts: dict[str, str],
+        on_hop: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        def run(name: str, prompt: str) -> dict[str, Any]:
+            result = self._chat_json(prompt)
+            # Empty results are failed hops; they are not worth resuming from.
+            if result and on_hop is not None:
+                on_hop(name, result)
+            return result
+
+        if not prompts:
+            return {}
+        workers = max(1, min(self.settings.llm_hop_concurrency, len(prompts)))
+        if workers == 1:
+            return {name: run(name, prompt) for name, prompt in prompts.items()}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(run, name, prompt) for name, prompt in prompts.items()}
+            return {name: future.result() for name, future in futures.items()}
+
     def _chat_json(self, prompt: str) -> dict[str, Any]:
         bounded_prompt = self._truncate_to_token_budget(prompt, self.INPUT_TOKEN_BUDGET)
         try:
             response = self._chat(bounded_prompt)
+        except Exception:
+            return {}
+        try:
             return self._safe_json(response)
         except Exception:
+            # Never keep serving an unparseable answer from the cache.
+            self.cache.discard(self._cache_key(bounded_prompt))
             return {}
 
-    @staticmethod
-    def _build_text_chunks(text: str, max_chunk_chars: int = 2600) -> list[str]:
-        clean = text.strip()
-        if not clean:
-            return [""]
-        if len(clean) <= max_chunk_chars:
-            return [clean]
-        middle_start = max((len(clean) // 2) - (max_chunk_chars // 2), 0)
-        chunks = [
-            clean[:max_chunk_chars],
-            clean[middle_start : middle_start + max_chunk_chars],
-            clean[-max_chunk_chars:],
-        ]
-        deduped: list[str] = []
-        seen = set()
-        for item in chunks:
-            marker = item[:120]
-            if marker not in seen:
-                seen.add(marker)
-                deduped.append(item)
-        return deduped
+    def _chat_json_stream(
+        self,
+        prompt: str,
+        field: str,
+        on_partial: Callable[[str], None],
+    ) -> dict[str, Any]:
+        bounded_prompt = self._truncate_to_token_budget(prompt, self.INPUT_TOKEN_BUDGET)
+        streamer = JSONStringFieldStreamer(field)
+        parts: list[str] = []
+        try:
+            for chunk in self._chat_stream(bounded_prompt):
+                parts.append(chunk)
+                if streamer.feed(chunk):
+                    on_partial(streamer.value)
+        except Exception:
+            return {}
+        try:
+            return self._safe_json("".join(parts))
+        except Exception:
+            self.cache.discard(self._cache_key(bounded_prompt))
+            return {}
 
     @staticmethod
     def _estimate_tokens(text: str) -> int:
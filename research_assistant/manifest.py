@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    paper_id: str
+    status: str
+
+
+# Path-alias table: one row per file path that maps to an indexed paper. Papers
+# are identified by content, so several paths (copies, renames, uploads) can
+# share a paper_id. A file whose size and mtime still match its row is known
+# without hashing it or asking Chroma.
+class IngestManifest:
+    INDEXED = "indexed"
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "content_hash TEXT NOT NULL, paper_id TEXT NOT NULL, status TEXT NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_paper_id ON files (paper_id)")
+
+    def load(self) -> dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, content_hash, paper_id, status FROM files"
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def get_many(self, paths: Iterable[str]) -> dict[str, ManifestEntry]:
+        wanted = list(dict.fromkeys(paths))
+        found: dict[str, ManifestEntry] = {}
+        with self._lock:
+            for start in range(0, len(wanted), self.LOOKUP_CHUNK):
+                chunk = wanted[start : start + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime_ns, content_hash, paper_id, status FROM files "
+                    f"WHERE path IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update((row[0], ManifestEntry(*row)) for row in rows)
+        return found
+
+    def paths_for(self, paper_id: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM files WHERE paper_id = ?", (paper_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def find_by_hash(self, content_hash: str) -> list[ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, content_hash, paper_id, status FROM files "
+                "WHERE content_hash = ? AND status = ? ORDER BY updated_at DESC",
+                (content_hash, self.INDEXED),
+            ).fetchall()
+        return [ManifestEntry(*row) for row in rows]
+
+    def record_many(self, entries: Iterable[ManifestEntry]) -> None:
+        now = time.time()
+        rows = [(*astuple(entry), now) for entry in entries]
+        if not rows:
+            return
+        # The connection block commits, or rolls back if the write fails.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, paper_id, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
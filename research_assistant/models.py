@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List
 
@@ -11,6 +11,11 @@ class ParsedPaper:
     file_name: str
     full_text: str
     equation_candidates: List[str]
+    page_texts: List[str] = field(default_factory=list)
+    # Pages in the PDF (page_texts may stop early under a page cap) and the
+    # extraction time of each parsed page.
+    page_count: int = 0
+    page_seconds: List[float] = field(default_factory=list)
 
 
 @dataclass
@@ -34,3 +39,11 @@ class IndexedPaper:
     added_at: datetime
     parsed: ParsedPaper
     insight: PaperInsight
+    source: str = "local"
+    near_duplicate_of: str = ""
+    near_duplicate_score: float = 0.0
+    # What produced this record; reindex --changed-only compares these.
+    content_hash: str = ""
+    embedding_model: str = ""
+    llm_model: str = ""
+    prompt_version: str = ""
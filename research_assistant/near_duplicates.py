@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+# MinHash signatures over word shingles of the parsed text, with LSH banding so
+# a lookup only compares against papers that share at least one band bucket.
+# Revisions of the same paper (arXiv v1/v2, camera-ready) land well above the
+# default threshold; unrelated papers on the same topic stay far below it.
+# Only the leading SIGNATURE_CHARS characters (title, abstract, introduction)
+# are signed, so a lazily parsed paper can be checked before its remaining
+# pages are extracted.
+class NearDuplicateIndex:
+    SIGNATURE_CHARS = 20000
+    SIGNATURE_CHUNK = 4096
+    MIN_WORDS_PER_SHINGLE = 20
+    # Bumped when signatures change meaning; older ones are dropped and the
+    # pipeline backfills them from the stored full texts.
+    SIGNATURE_VERSION = 3
+    def __init__(
+        self,
+        path: Path,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        generator = np.random.default_rng(1)
+        self._a = generator.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures (paper_id TEXT PRIMARY KEY, num_perm INTEGER NOT NULL, "
+            "signature BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (band INTEGER NOT NULL, bucket TEXT NOT NULL, paper_id TEXT NOT NULL, "
+            "PRIMARY KEY (band, bucket, paper_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_paper_id ON buckets (paper_id)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.SIGNATURE_VERSION:
+            # Writes run in the connection block, which commits or rolls back, so
+            # a failed write cannot leave the index stuck inside a transaction.
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM signatures")
+                self._conn.execute("DELETE FROM buckets")
+                self._conn.execute(f"PRAGMA user_version = {self.SIGNATURE_VERSION}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0])
+
+    def signature(self, text: str) -> np.ndarray | None:
+        # Whitespace is collapsed first so text stitched back from passages
+        # signs the same window as the freshly parsed text.
+        words = _WORD_PATTERN.findall(" ".join(text.split())[: self.SIGNATURE_CHARS].lower())
+        # Scans with only page numbers or a repeated watermark line would all
+        # look identical; too little distinct wording gets no signature.
+        if len({word for word in words if not word.isdigit()}) < self.shingle_size * self.MIN_WORDS_PER_SHINGLE:
+            return None
+        size = min(self.shingle_size, max(1, len(words)))
+        shingles = {" ".join(words[index : index + size]) for index in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+                for shingle in shingles
+            ),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (a * x + b) mod p stays inside uint64 because a, b < 2^31 and x < 2^32.
+        # Shingles are permuted a block at a time so memory stays at
+        # SIGNATURE_CHUNK x num_perm however long the text is.
+        signature = np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), self.SIGNATURE_CHUNK):
+            permuted = (np.outer(hashes[start : start + self.SIGNATURE_CHUNK], self._a) + self._b) % _MERSENNE_PRIME
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+    def query(self, signature: np.ndarray, exclude: Iterable[str] = ()) -> list[tuple[str, float]]:
+        excluded = set(exclude)
+        with self._lock:
+            candidates: set[str] = set()
+            for band, bucket in enumerate(self._buckets(signature)):
+                rows = self._conn.execute(
+                    "SELECT paper_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ).fetchall()
+                candidates.update(row[0] for row in rows)
+            candidates -= excluded
+            if not candidates:
+                return []
+            placeholders = ",".join("?" for _ in candidates)
+            stored = self._conn.execute(
+                f"SELECT paper_id, signature FROM signatures WHERE num_perm = ? AND paper_id IN ({placeholders})",
+                (self.num_perm, *candidates),
+            ).fetchall()
+
+        matches = [
+            (paper_id, float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature)))
+            for paper_id, blob in stored
+        ]
+        return sorted(
+            [(paper_id, round(score, 4)) for paper_id, score in matches if score >= self.threshold],
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def add_many(self, signatures: dict[str, np.ndarray]) -> None:
+        if not signatures:
+            return
+        bucket_rows = [
+            (band, bucket, paper_id)
+            for paper_id, signature in signatures.items()
+            for band, bucket in enumerate(self._buckets(signature))
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._delete(list(signatures))
+            self._conn.executemany(
+                "INSERT INTO signatures (paper_id, num_perm, signature) VALUES (?, ?, ?)",
+                [
+                    (paper_id, self.num_perm, signature.astype(np.uint32).tobytes())
+                    for paper_id, signature in signatures.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO buckets (band, bucket, paper_id) VALUES (?, ?, ?)", bucket_rows
+            )
+
+    def remove(self, paper_ids: list[str]) -> None:
+        if not paper_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._delete(paper_ids)
+
+    def stats(self) -> dict[str, Any]:
+        return {"papers": len(self), "threshold": self.threshold, "num_perm": self.num_perm, "bands": self.bands}
+
+    def _delete(self, paper_ids: list[str]) -> None:
+        for start in range(0, len(paper_ids), 500):
+            chunk = paper_ids[start : start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            self._conn.execute(f"DELETE FROM signatures WHERE paper_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM buckets WHERE paper_id IN ({placeholders})", chunk)
+
+    def _buckets(self, signature: np.ndarray) -> list[str]:
+        signature = np.asarray(signature, dtype=np.uint32)
+        return [
+            hashlib.blake2b(signature[band * self.rows : (band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
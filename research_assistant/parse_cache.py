@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any
+
+from .models import ParsedPaper
+
+# One sidecar file per PDF content hash holding the extracted page texts, so
+# re-indexing, re-analysis and the Reading Companion skip PyMuPDF extraction.
+# Layout:
+#   header    magic, version, pages in the PDF, pages stored, metadata length
+#   offsets   stored + 1 little-endian uint64 offsets into the page section
+#   metadata  zlib JSON (equation candidates)
+#   pages     one zlib stream per page
+# Files are memory-mapped; reading one page decompresses only that page.
+_MAGIC = b"RAPC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHIII")
+_OFFSET = struct.Struct("<Q")
+
+
+class ParsedSidecar:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.page_count, self.stored_pages, meta_length = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path.name} is not a version {_VERSION} parse sidecar")
+            self._offsets_at = _HEADER.size
+            meta_at = self._offsets_at + (self.stored_pages + 1) * _OFFSET.size
+            self._pages_at = meta_at + meta_length
+            self._meta: dict[str, Any] = json.loads(zlib.decompress(self._map[meta_at : self._pages_at]))
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> ParsedSidecar:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+
+    @property
+    def equation_candidates(self) -> list[str]:
+        return list(self._meta.get("equation_candidates", []))
+
+    def page_text(self, number: int) -> str:
+        if not 0 <= number < self.stored_pages:
+            raise IndexError(f"page {number} is not stored in {self.path.name}")
+        start = _OFFSET.unpack_from(self._map, self._offsets_at + number * _OFFSET.size)[0]
+        stop = _OFFSET.unpack_from(self._map, self._offsets_at + (number + 1) * _OFFSET.size)[0]
+        return zlib.decompress(self._map[self._pages_at + start : self._pages_at + stop]).decode("utf-8")
+
+    def page_texts(self) -> list[str]:
+        return [self.page_text(number) for number in range(self.stored_pages)]
+
+
+class ParseCache:
+    SUFFIX = ".pages"
+
+    def __init__(self, root: Path, enabled: bool = True) -> None:
+        self.root = root
+        self.enabled = enabled
+        if enabled:
+            root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / f"{content_hash}{self.SUFFIX}"
+
+    def open(self, content_hash: str) -> ParsedSidecar | None:
+        if not self.enabled or not content_hash:
+            return None
+        path = self.path_for(content_hash)
+        try:
+            sidecar = ParsedSidecar(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error):
+            # Truncated or from an older layout: drop it and re-extract.
+            path.unlink(missing_ok=True)
+            return None
+        return sidecar
+
+    def store(self, content_hash: str, parsed: ParsedPaper) -> None:
+        if not self.enabled or not content_hash:
+            return
+        pages = [zlib.compress(text.encode("utf-8"), 6) for text in parsed.page_texts]
+        meta = zlib.compress(json.dumps({"equation_candidates": parsed.equation_candidates}).encode("utf-8"))
+        offsets = [0]
+        for page in pages:
+            offsets.append(offsets[-1] + len(page))
+        path = self.path_for(content_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Parse workers and threads may write the same hash concurrently; each
+        # writes its own temp file and the rename keeps readers off partial ones.
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with temp_path.open("wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, _VERSION, parsed.page_count, len(pages), len(meta)))
+            handle.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+            handle.write(meta)
+            handle.writelines(pages)
+        os.replace(temp_path, path)
+
+    def stats(self) -> dict[str, Any]:
+        files = list(self.root.glob(f"*/*{self.SUFFIX}")) if self.enabled else []
+        return {"papers": len(files), "bytes": sum(path.stat().st_size for path in files)}
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import multiprocessing
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, Iterator, List
 
 import fitz
 
 from .models import ParsedPaper
+from .parse_cache import ParseCache
 
 EQUATION_PATTERN = re.compile(
     r"(?:\\[a-zA-Z]+|\$[^\$]{2,}\$|[A-Za-z]\s*=\s*[^\n]{1,80}|[∑∫√≈≠≤≥→λθμσπ])"
@@ -14,8 +21,7 @@ EQUATION_PATTERN = re.compile(
 
 
 
-def _extract_equation_candidates(lines: List[str]) -> List[str]:
-    candidates: list[str] = []
+def _iter_equation_candidates(lines: Iterable[str]) -> Iterator[str]:
     seen = set()
     for line in lines:
         text = line.strip()
@@ -25,22 +31,307 @@ def _extract_equation_candidates(lines: List[str]) -> List[str]:
             normalized = re.sub(r"\s+", " ", text)
             if normalized not in seen:
                 seen.add(normalized)
-                candidates.append(normalized)
-    return candidates[:80]
+                yield normalized
+
+
+def _extract_equation_candidates(lines: List[str]) -> List[str]:
+    return list(islice(_iter_equation_candidates(lines), 80))
+
+
+def _dedupe_windows(windows: list[str]) -> list[str]:
+    deduped: list[str] = []
+    seen = set()
+    for item in windows:
+        marker = item[:120]
+        if marker not in seen:
+            seen.add(marker)
+            deduped.append(item)
+    return deduped
+
+
+def text_windows(text: str, max_chars: int) -> list[str]:
+    # Start, middle and end slices of the paper, the context the LLM hops see.
+    clean = text.strip()
+    if not clean:
+        return [""]
+    if len(clean) <= max_chars:
+        return [clean]
+    middle_start = max((len(clean) // 2) - (max_chars // 2), 0)
+    return _dedupe_windows(
+        [clean[:max_chars], clean[middle_start : middle_start + max_chars], clean[-max_chars:]]
+    )
+
+
+def _gather(page_text: Callable[[int], str], numbers: Iterable[int], max_chars: int) -> list[int]:
+    # Pages in the given order until together they hold max_chars of text.
+    gathered, total = [], 0
+    for number in numbers:
+        gathered.append(number)
+        total += len(page_text(number).strip()) + 1
+        if total > max_chars:
+            break
+    return gathered
+
 
+def _page_windows(page_text: Callable[[int], str], page_count: int, max_chars: int) -> list[str]:
+    # Start and end windows are read from pages at either edge and the middle
+    # one from pages around the centre page, so long papers are windowed
+    # without reading every page. Only page texts decide the result: eager and
+    # lazy papers (and journal resumes) send the LLM identical context.
+    head = _gather(page_text, range(page_count), max_chars)
+    if len(head) == page_count:
+        # Short paper: every page is read anyway, so slice the whole text.
+        return text_windows("\n".join(page_text(number) for number in range(page_count)), max_chars)
+    tail = sorted(_gather(page_text, range(page_count - 1, -1, -1), max_chars))
+    centre = page_count // 2
+    around = [centre + (step + 1) // 2 * (1 if step % 2 else -1) for step in range(2 * page_count)]
+    middle = sorted(_gather(page_text, [number for number in around if 0 <= number < page_count], max_chars))
+    # Character offset of the centre page within the joined middle text.
+    centre_at = sum(len(page_text(number)) + 1 for number in middle if number < centre)
+    joined = "\n".join(page_text(number) for number in middle)
+    midpoint = centre_at + len(page_text(centre)) // 2
+    start = min(max(midpoint - max_chars // 2, 0), max(len(joined) - max_chars, 0))
+    return _dedupe_windows(
+        [
+            "\n".join(page_text(number) for number in head).lstrip()[:max_chars],
+            joined[start : start + max_chars],
+            "\n".join(page_text(number) for number in tail).rstrip()[-max_chars:],
+        ]
+    )
+
+
+@dataclass(frozen=True)
+class ParseOptions:
+    # 0 keeps every page; e.g. 30 stops before long appendices.
+    max_pages: int = 0
+    # Documents with at least parallel_min_pages pages are split into page
+    # ranges across page_workers processes; 1 keeps parsing serial.
+    page_workers: int = 1
+    parallel_min_pages: int = 64
+    # Pages slower than this are called out in the ingest message.
+    slow_page_seconds: float = 2.0
+
+
+def parse_context() -> multiprocessing.context.BaseContext:
+    # Forking the watcher or Streamlit process would copy locks held by its
+    # LLM, embedding and HTTP threads into the parse workers. A fork server
+    # starts from a clean single-threaded process instead. Its children
+    # re-import the entry script, so the server preloads the package modules
+    # that script pulled in; each worker then only runs the script's own body.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        package = __name__.rpartition(".")[0]
+        loaded = sorted(name for name in sys.modules if name.startswith(f"{package}."))
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", __name__, *loaded])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _timed_page_text(page: fitz.Page) -> tuple[str, float]:
+    started = time.perf_counter()
+    text = page.get_text("text")
+    return text, time.perf_counter() - started
 
 
-def parse_pdf(pdf_path: Path) -> ParsedPaper:
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> list[tuple[str, float]]:
+    # Each worker opens its own handle; PyMuPDF documents cannot cross processes.
     with fitz.open(pdf_path) as doc:
-        page_texts = [page.get_text("text") for page in doc]
+        return [_timed_page_text(doc[number]) for number in range(start, stop)]
+
+
+def _page_ranges(page_count: int, parts: int) -> list[tuple[int, int]]:
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
 
-    full_text = "\n".join(page_texts)
-    lines = full_text.splitlines()
-    equation_candidates = _extract_equation_candidates(lines)
 
+def _parsed_paper(
+    pdf_path: Path,
+    page_count: int,
+    pages: list[tuple[str, float]],
+    equation_candidates: list[str] | None = None,
+) -> ParsedPaper:
+    page_texts = [text for text, _ in pages]
+    full_text = "\n".join(page_texts)
+    if equation_candidates is None:
+        equation_candidates = _extract_equation_candidates(full_text.splitlines())
     return ParsedPaper(
         file_path=str(pdf_path.resolve()),
         file_name=pdf_path.name,
         full_text=full_text,
         equation_candidates=equation_candidates,
+        page_texts=page_texts,
+        page_count=page_count,
+        page_seconds=[round(seconds, 4) for _, seconds in pages],
     )
+
+
+# ParsedPaper stand-in that extracts pages only when something reads them. The
+# LLM context needs the start, middle and end of a paper plus its first few
+# equations, so those are pulled page by page from either edge and the centre;
+# full_text, page_texts and equation_candidates extract every remaining page
+# (as do passage indexing, BM25 and near-duplicate checks through them).
+# With a parse cache, pages come from the paper's sidecar when it has one and
+# a full extraction writes the sidecar for next time.
+class LazyParsedPaper:
+    def __init__(
+        self,
+        pdf_path: Path,
+        options: ParseOptions | None = None,
+        cache: ParseCache | None = None,
+        content_hash: str = "",
+    ) -> None:
+        options = options or ParseOptions()
+        self.file_path = str(pdf_path.resolve())
+        self.file_name = pdf_path.name
+        self._pdf_path = pdf_path
+        self._cache = cache
+        self._content_hash = content_hash
+        self._sidecar = cache.open(content_hash) if cache is not None else None
+        self._doc: fitz.Document | None = None if self._sidecar is not None else fitz.open(pdf_path)
+        self.page_count = self._sidecar.page_count if self._sidecar is not None else self._doc.page_count
+        self.page_limit = min(self.page_count, options.max_pages) if options.max_pages > 0 else self.page_count
+        if self._sidecar is not None and self._sidecar.stored_pages < self.page_limit:
+            # Written under a smaller page cap; extract again and replace it.
+            self._sidecar.close()
+            self._sidecar = None
+        self.cached = self._sidecar is not None
+        self._pages: list[tuple[str, float] | None] = [None] * self.page_limit
+        self._full: ParsedPaper | None = None
+
+    def __enter__(self) -> LazyParsedPaper:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        if self._sidecar is not None:
+            self._sidecar.close()
+            self._sidecar = None
+
+    @property
+    def extracted_pages(self) -> int:
+        return sum(page is not None for page in self._pages)
+
+    def page_text(self, number: int) -> str:
+        page = self._pages[number]
+        if page is None and self._sidecar is not None:
+            page = self._pages[number] = (self._sidecar.page_text(number), 0.0)
+        elif page is None:
+            if self._doc is None:
+                self._doc = fitz.open(self._pdf_path)
+            page = self._pages[number] = _timed_page_text(self._doc[number])
+        return page[0]
+
+    def iter_pages(self) -> Iterator[str]:
+        for number in range(self.page_limit):
+            yield self.page_text(number)
+
+    def title_line(self) -> str:
+        lines = self.page_text(0).splitlines() if self.page_limit else []
+        return lines[0] if lines else ""
+
+    def leading_text(self, max_chars: int) -> str:
+        # Same as leading_text() on the full text, reading pages from the front only.
+        words: list[str] = []
+        length = -1
+        for text in self.iter_pages():
+            page_words = text.split()
+            words.extend(page_words)
+            length += sum(len(word) + 1 for word in page_words)
+            if length >= max_chars:
+                break
+        return " ".join(words)[:max_chars]
+
+    def leading_equations(self, limit: int) -> list[str]:
+        # Same as equation_candidates[:limit], but stops reading pages once found.
+        if self._full is not None:
+            return self._full.equation_candidates[:limit]
+        lines = (line for text in self.iter_pages() for line in text.splitlines())
+        return list(islice(_iter_equation_candidates(lines), min(limit, 80)))
+
+    def text_windows(self, max_chars: int) -> list[str]:
+        return _page_windows(self.page_text, self.page_limit, max_chars)
+
+    def materialize(self) -> ParsedPaper:
+        if self._full is None:
+            for number in range(self.page_limit):
+                self.page_text(number)
+            equations = None
+            if self._sidecar is not None and self._sidecar.stored_pages == self.page_limit:
+                equations = self._sidecar.equation_candidates
+            pages = [page for page in self._pages if page]
+            self._full = _parsed_paper(self._pdf_path, self.page_count, pages, equations)
+            if self._cache is not None and not self.cached:
+                self._cache.store(self._content_hash, self._full)
+            self.close()
+        return self._full
+
+    @property
+    def full_text(self) -> str:
+        return self.materialize().full_text
+
+    @property
+    def page_texts(self) -> list[str]:
+        return self.materialize().page_texts
+
+    @property
+    def equation_candidates(self) -> list[str]:
+        return self.materialize().equation_candidates
+
+    @property
+    def page_seconds(self) -> list[float]:
+        return self.materialize().page_seconds
+
+
+def parse_pdf(
+    pdf_path: Path,
+    options: ParseOptions | None = None,
+    cache: ParseCache | None = None,
+    content_hash: str = "",
+) -> ParsedPaper:
+    options = options or ParseOptions()
+    with LazyParsedPaper(pdf_path, options, cache, content_hash) as paper:
+        page_count, limit = paper.page_count, paper.page_limit
+        if paper.cached or options.page_workers <= 1 or limit < max(2, options.parallel_min_pages):
+            return paper.materialize()
+
+    # A few more ranges than workers so one dense range does not hold up the rest.
+    ranges = _page_ranges(limit, options.page_workers * 2)
+    with ProcessPoolExecutor(max_workers=options.page_workers, mp_context=parse_context()) as pool:
+        futures = [pool.submit(_extract_page_range, str(pdf_path), start, stop) for start, stop in ranges]
+        pages = [page for future in futures for page in future.result()]
+    parsed = _parsed_paper(pdf_path, page_count, pages)
+    if cache is not None:
+        cache.store(content_hash, parsed)
+    return parsed
+
+
+def context_windows(parsed: ParsedPaper | LazyParsedPaper, max_chars: int) -> list[str]:
+    if isinstance(parsed, LazyParsedPaper):
+        return parsed.text_windows(max_chars)
+    pages = parsed.page_texts or [parsed.full_text]
+    return _page_windows(pages.__getitem__, len(pages), max_chars)
+
+
+def leading_text(parsed: ParsedPaper | LazyParsedPaper, max_chars: int) -> str:
+    # The first max_chars characters with whitespace collapsed, so the result
+    # does not depend on how the text was laid out or stitched back together.
+    if isinstance(parsed, LazyParsedPaper):
+        return parsed.leading_text(max_chars)
+    return " ".join(parsed.full_text.split())[:max_chars]
+
+
+def title_line(parsed: ParsedPaper | LazyParsedPaper) -> str:
+    if isinstance(parsed, LazyParsedPaper):
+        return parsed.title_line()
+    return parsed.full_text.splitlines()[0] if parsed.full_text else ""
+
+
+def slow_pages(parsed: ParsedPaper, threshold: float) -> list[tuple[int, float]]:
+    # 1-based page numbers with their extraction time, slowest first.
+    slow = [(number + 1, seconds) for number, seconds in enumerate(parsed.page_seconds) if seconds >= threshold]
+    return sorted(slow, key=lambda item: item[1], reverse=True)
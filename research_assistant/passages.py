@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List
+
+from .models import ParsedPaper
+
+_WORD_PATTERN = re.compile(r"\S+")
+
+
+@dataclass
+class Passage:
+    passage_id: str
+    paper_id: str
+    index: int
+    page_start: int
+    page_end: int
+    text: str
+    # Leading words repeated from the previous passage.
+    overlap_words: int = 0
+
+
+def split_passages(paper_id: str, parsed: ParsedPaper, size: int = 1200, overlap: int = 200) -> List[Passage]:
+    # Papers parsed before page texts were kept fall back to a single "page".
+    pages = parsed.page_texts or [parsed.full_text]
+    words: list[tuple[str, int]] = [
+        (word, page_number)
+        for page_number, page_text in enumerate(pages, start=1)
+        for word in _WORD_PATTERN.findall(page_text)
+    ]
+    if not words:
+        return []
+
+    size = max(200, size)
+    overlap = min(max(0, overlap), size // 2)
+    passages: list[Passage] = []
+    start = 0
+    carried_words = 0
+    while start < len(words):
+        end = start
+        length = 0
+        while end < len(words) and (length == 0 or length + len(words[end][0]) + 1 <= size):
+            length += len(words[end][0]) + 1
+            end += 1
+
+        passages.append(
+            Passage(
+                passage_id=f"{paper_id}:{len(passages)}",
+                paper_id=paper_id,
+                index=len(passages),
+                page_start=words[start][1],
+                page_end=words[end - 1][1],
+                text=" ".join(word for word, _ in words[start:end]),
+                overlap_words=carried_words,
+            )
+        )
+        if end >= len(words):
+            break
+
+        # Step back roughly `overlap` characters so sentences cut at a boundary
+        # appear whole in one of the two neighbouring passages.
+        back = end
+        carried = 0
+        while back > start + 1 and carried < overlap:
+            back -= 1
+            carried += len(words[back][0]) + 1
+        carried_words = end - back
+        start = back
+    return passages
+
+
+def join_passages(passages: Iterable[tuple[str, int | None]]) -> str:
+    # Rebuilds the paper text from (text, overlap_words) pairs in passage order.
+    # Passages stored before overlap_words was recorded pass None; their overlap
+    # is the longest run of leading words that ends the previous passage.
+    words: list[str] = []
+    for text, overlap in passages:
+        passage_words = text.split(" ")
+        if overlap is None:
+            overlap = next(
+                (
+                    size
+                    for size in range(min(len(words), len(passage_words) - 1), 0, -1)
+                    if words[-size:] == passage_words[:size]
+                ),
+                0,
+            )
+        words.extend(passage_words[overlap:])
+    return " ".join(words)
@@ -1,47 +1,378 @@
 from __future__ import annotations
 
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable
 
-from .embeddings import Embedder
+import numpy as np
+
+from .async_llm_client import AsyncLocalLLMClient
+from .embeddings import Embedder, EmbeddingService
+from .hashing import file_sha256
+from .hop_memo import HopMemo
+from .journal import IngestJournal
 from .llm_client import LocalLLMClient
-from .models import IndexedPaper
-from .parser import parse_pdf
+from .manifest import IngestManifest, ManifestEntry
+from .models import IndexedPaper, PaperInsight, ParsedPaper
+from .near_duplicates import NearDuplicateIndex
+from .parse_cache import ParseCache
+from .parser import LazyParsedPaper, ParseOptions, leading_text, parse_pdf, slow_pages, title_line
+from .passages import Passage, split_passages
 from .report import generate_paper_report
 from .vector_store import PaperStore
 
 
+SEARCH_MODES = ("paper", "passage")
+PASSAGE_AGGREGATES = ("max", "topk-sum")
+
+
 class IngestionPipeline:
+    PASSAGE_EMBED_BATCH = 64
+    PASSAGE_CANDIDATES_PER_RESULT = 8
+    PASSAGE_TOP_K = 3
+    HYBRID_CANDIDATE_FACTOR = 3
+    RRF_K = 60
+
     def __init__(
         self,
         store: PaperStore,
-        embedder: Embedder,
+        embedder: Embedder | EmbeddingService,
         llm_client: LocalLLMClient,
         reports_dir: Path | None = None,
+        passage_size: int = 1200,
+        passage_overlap: int = 200,
+        hybrid_search: bool = True,
+        manifest: IngestManifest | None = None,
+        near_duplicates: NearDuplicateIndex | None = None,
+        journal: IngestJournal | None = None,
+        hop_memo: HopMemo | None = None,
+        parse_options: ParseOptions | None = None,
+        parse_cache: ParseCache | None = None,
     ) -> None:
         self.store = store
         self.embedder = embedder
         self.llm_client = llm_client
         self.reports_dir = reports_dir
+        self.passage_size = passage_size
+        self.passage_overlap = passage_overlap
+        self.hybrid_search = hybrid_search
+        self.manifest = manifest
+        self.near_duplicates = near_duplicates
+        self.journal = journal
+        self.hop_memo = hop_memo
+        self.parse_options = parse_options or ParseOptions()
+        self.parse_cache = parse_cache
+        if near_duplicates is not None and len(near_duplicates) == 0 and store.collection.count() > 0:
+            self.backfill_signatures()
+
+    def identify(self, pdf_path: Path) -> tuple[str, str]:
+        content_hash = file_sha256(pdf_path)
+        return self.store.content_paper_id(content_hash), content_hash
+
+    def paper_id_for(self, pdf_path: Path) -> str:
+        return self.identify(pdf_path)[0]
+
+    def legacy_paper_id(self, pdf_path: Path) -> str:
+        return self.store.build_paper_id(str(pdf_path.resolve()))
+
+    def indexed_matches(self, candidates: list[tuple[Path, str]]) -> dict[Path, str]:
+        # Content id first; papers indexed under the old path id still count as
+        # indexed so upgrading does not re-analyze the whole library.
+        legacy = {path: self.legacy_paper_id(path) for path, _ in candidates}
+        existing = self.store.existing_ids([paper_id for _, paper_id in candidates] + list(legacy.values()))
+        matches: dict[Path, str] = {}
+        for path, paper_id in candidates:
+            if paper_id in existing:
+                matches[path] = paper_id
+            elif legacy[path] in existing:
+                matches[path] = legacy[path]
+        return matches
+
+    def ingest_pdf(self, pdf_path: Path, force: bool = False, source: str | None = None) -> str:
+        # Hash the bytes before anything else: known content never reaches the
+        # parser or the LLM.
+        paper_id, content_hash = self.identify(pdf_path)
+        state = self.journal_states([content_hash]).get(content_hash, {})
+        if not force and not state:
+            existing = self.indexed_matches([(pdf_path, paper_id)]).get(pdf_path)
+            if existing is not None:
+                return self.note_duplicate(pdf_path, existing, content_hash)
+
+        parsed = self.parsed_from_journal(state)
+        lazy = None
+        if parsed is None and self.parse_options.page_workers <= 1:
+            # The near-duplicate check and the LLM hops only read a few pages;
+            # everything after them (passages, BM25, report, journal) gets the
+            # fully extracted paper.
+            parsed = lazy = LazyParsedPaper(pdf_path, self.parse_options, self.parse_cache, content_hash)
+        elif parsed is None:
+            parsed = parse_pdf(pdf_path, self.parse_options, self.parse_cache, content_hash)
+            self.journal_record(content_hash, "parse", parsed)
+        try:
+            near_duplicate = None if force else self.find_near_duplicate(paper_id, parsed)
+            if near_duplicate is not None:
+                indexed = self.build_indexed(paper_id, pdf_path, parsed, near_duplicate[2], source, content_hash)
+                self.link_near_duplicate(indexed, near_duplicate)
+            else:
+                insight = self.analyze(content_hash, parsed, state)
+                indexed = self.build_indexed(paper_id, pdf_path, parsed, insight, source, content_hash)
+            if lazy is not None:
+                indexed.parsed = lazy.materialize()
+                self.journal_record(content_hash, "parse", indexed.parsed)
+        finally:
+            if lazy is not None:
+                lazy.close()
+
+        embedding = self.embedding_from_journal(state)
+        if embedding is None:
+            embedding = self.embedder.embed([self.embedding_source(indexed)])[0]
+            self.journal_record(content_hash, "embed", embedding)
+        self.store_indexed([indexed], [embedding], [content_hash])
+        self.record_paths([(pdf_path, paper_id, content_hash)])
+        self.journal_finish([content_hash])
+        return self.indexed_message(pdf_path, force, indexed)
+
+    def journal_states(self, content_hashes: list[str]) -> dict[str, dict[str, Any]]:
+        if self.journal is None:
+            return {}
+        return self.journal.load_many(content_hash for content_hash in content_hashes if content_hash)
+
+    def journal_record(self, content_hash: str, stage: str, output: Any = None) -> None:
+        if self.journal is None or not content_hash:
+            return
+        if isinstance(output, ParsedPaper):
+            output = asdict(output)
+        elif isinstance(output, np.ndarray):
+            output = output.tolist()
+        self.journal.record(content_hash, stage, output)
+
+    def journal_finish(self, content_hashes: list[str]) -> None:
+        if self.journal is not None:
+            self.journal.finish(content_hashes)
+
+    @staticmethod
+    def parsed_from_journal(state: dict[str, Any]) -> ParsedPaper | None:
+        return ParsedPaper(**state["parse"]) if "parse" in state else None
+
+    @staticmethod
+    def embedding_from_journal(state: dict[str, Any]) -> np.ndarray | None:
+        return np.asarray(state["embed"], dtype=np.float32) if "embed" in state else None
+
+    def analyze(self, content_hash: str, parsed: ParsedPaper, state: dict[str, Any] | None = None) -> PaperInsight:
+        completed, on_hop = self._hop_hooks(content_hash, state)
+        return self.llm_client.analyze_paper(parsed, completed_hops=completed, on_hop=on_hop)
+
+    async def analyze_async(
+        self,
+        client: AsyncLocalLLMClient,
+        content_hash: str,
+        parsed: ParsedPaper,
+        state: dict[str, Any] | None = None,
+    ) -> PaperInsight:
+        completed, on_hop = self._hop_hooks(content_hash, state)
+        return await client.analyze_paper(parsed, completed_hops=completed, on_hop=on_hop)
+
+    def _hop_hooks(
+        self, content_hash: str, state: dict[str, Any] | None
+    ) -> tuple[dict[str, Any], Callable[[str, dict[str, Any]], None]]:
+        # Hops to reuse (memo, then journal) and the callback that journals and
+        # memoizes each new hop; shared by the sync and async clients.
+        fingerprints = self.llm_client.hop_fingerprints()
+        model = self.llm_client.settings.llm_model
+        completed: dict[str, Any] = {}
+        if self.hop_memo is not None:
+            completed = self.hop_memo.get(content_hash, fingerprints, model)
+            # Stage-two outputs were derived from the memoized hop 1; without it
+            # they would no longer match a freshly generated overview.
+            if "stage_one" not in completed:
+                completed = {}
+            self.hop_memo.count(len(completed), len(fingerprints))
+        completed.update(state or {})
+
+        def on_hop(hop: str, output: dict[str, Any]) -> None:
+            self.journal_record(content_hash, hop, output)
+            if self.hop_memo is not None:
+                self.hop_memo.put(content_hash, hop, fingerprints[hop], model, output)
+
+        return completed, on_hop
+
+    def find_near_duplicate(
+        self, paper_id: str, parsed: ParsedPaper | LazyParsedPaper
+    ) -> tuple[str, float, PaperInsight] | None:
+        # Another version of an indexed paper (arXiv revision, camera-ready):
+        # reuse its analysis instead of running the four LLM hops again.
+        if self.near_duplicates is None:
+            return None
+        signature = self.near_duplicates.signature(leading_text(parsed, self.near_duplicates.SIGNATURE_CHARS))
+        if signature is None:
+            return None
+        matches = self.near_duplicates.query(signature, exclude=[paper_id])
+        if not matches:
+            return None
+        papers = self.store.get_papers([match_id for match_id, _ in matches])
+        for match_id, score in matches:
+            if match_id in papers:
+                return match_id, score, self.insight_from_metadata(papers[match_id]["metadata"])
+        return None
+
+    @staticmethod
+    def link_near_duplicate(indexed: IndexedPaper, near_duplicate: tuple[str, float, PaperInsight]) -> None:
+        indexed.near_duplicate_of, indexed.near_duplicate_score, _ = near_duplicate
+
+    @staticmethod
+    def insight_from_metadata(meta: dict) -> PaperInsight:
+        def items(key: str) -> list[str]:
+            return [item for item in str(meta.get(key, "")).split(" || ") if item.strip()]
+
+        return PaperInsight(
+            summary=str(meta.get("summary", "")),
+            innovations=items("innovations"),
+            contributions=items("contributions"),
+            method_type=str(meta.get("method_type", "other")),
+            training_info=items("training_info"),
+            architecture=str(meta.get("architecture", "")),
+            pros=items("pros"),
+            cons=items("cons"),
+            next_steps=items("next_steps"),
+            research_ideas=items("research_ideas"),
+        )
 
-    def ingest_pdf(self, pdf_path: Path, force: bool = False) -> str:
-        paper_id = self.store.build_paper_id(str(pdf_path.resolve()))
-        if self.store.exists(paper_id) and not force:
-            return f"Skipped {pdf_path.name} (already indexed)."
+    def index_signatures(self, items: list[IndexedPaper]) -> None:
+        if self.near_duplicates is None:
+            return
+        signatures = {indexed.paper_id: self.near_duplicates.signature(indexed.parsed.full_text) for indexed in items}
+        # A re-indexed paper whose text no longer qualifies drops its old signature.
+        self.near_duplicates.remove([paper_id for paper_id, signature in signatures.items() if signature is None])
+        self.near_duplicates.add_many(
+            {paper_id: signature for paper_id, signature in signatures.items() if signature is not None}
+        )
+
+    def backfill_signatures(self) -> None:
+        if self.near_duplicates is None:
+            return
+        batch: dict = {}
+        for paper_id, _, full_text in self.store.iter_full_texts():
+            signature = self.near_duplicates.signature(full_text)
+            if signature is not None:
+                batch[paper_id] = signature
+            if len(batch) >= self.store.PAGE_SIZE:
+                self.near_duplicates.add_many(batch)
+                batch = {}
+        self.near_duplicates.add_many(batch)
+
+    def delete_papers(self, paper_ids: list[str]) -> None:
+        self.store.delete_papers(paper_ids)
+        if self.near_duplicates is not None:
+            self.near_duplicates.remove(paper_ids)
+
+    def note_duplicate(self, pdf_path: Path, paper_id: str, content_hash: str) -> str:
+        previous = self.store.get_papers([paper_id]).get(paper_id)
+        previous_path = str(previous["metadata"].get("file_path", "")) if previous else ""
+        self.record_paths([(pdf_path, paper_id, content_hash)])
+        resolved = str(pdf_path.resolve())
+        if not previous_path or previous_path == resolved:
+            return self.skipped_message(pdf_path)
+        if Path(previous_path).exists():
+            return f"Skipped {pdf_path.name} (same content as {Path(previous_path).name})."
+        self.store.update_file_path(paper_id, resolved)
+        if self.manifest is not None:
+            self.manifest.remove(previous_path)
+        return f"Skipped {pdf_path.name} (renamed from {Path(previous_path).name}; path updated)."
 
-        parsed = parse_pdf(pdf_path)
-        insight = self.llm_client.analyze_paper(parsed)
+    def record_paths(self, entries: list[tuple[Path, str, str]]) -> None:
+        # Papers this path used to point at (an older version of an edited PDF, or
+        # its legacy path id) are dropped once no other path refers to them.
+        rows: list[ManifestEntry] = []
+        replaced: set[str] = set()
+        for pdf_path, paper_id, content_hash in entries:
+            legacy_id = self.legacy_paper_id(pdf_path)
+            if legacy_id != paper_id:
+                replaced.add(legacy_id)
+            try:
+                stat = pdf_path.stat()
+            except FileNotFoundError:
+                continue
+            rows.append(
+                ManifestEntry(
+                    path=str(pdf_path.resolve()),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    content_hash=content_hash,
+                    paper_id=paper_id,
+                    status=IngestManifest.INDEXED,
+                )
+            )
 
-        title = parsed.full_text.splitlines()[0][:180] if parsed.full_text else pdf_path.stem
-        indexed = IndexedPaper(
+        if self.manifest is not None:
+            previous = self.manifest.get_many(row.path for row in rows)
+            replaced.update(
+                entry.paper_id for row in rows if (entry := previous.get(row.path)) and entry.paper_id != row.paper_id
+            )
+            self.manifest.record_many(rows)
+            replaced = {paper_id for paper_id in replaced if not self.manifest.paths_for(paper_id)}
+        replaced -= {paper_id for _, paper_id, _ in entries}
+        self.delete_papers(sorted(self.store.existing_ids(sorted(replaced))))
+
+    def build_indexed(
+        self,
+        paper_id: str,
+        pdf_path: Path,
+        parsed: ParsedPaper,
+        insight: PaperInsight,
+        source: str | None = None,
+        content_hash: str = "",
+    ) -> IndexedPaper:
+        title = title_line(parsed)[:180]
+        return IndexedPaper(
             paper_id=paper_id,
             title=title or pdf_path.stem,
             added_at=datetime.utcnow(),
             parsed=parsed,
             insight=insight,
+            source=source or self.existing_source(paper_id),
+            content_hash=content_hash,
+            **self.analysis_versions(),
         )
 
-        embedding_source = (
+    def analysis_versions(self) -> dict[str, str]:
+        return {
+            "embedding_model": self.embedder.version,
+            "llm_model": self.llm_client.settings.llm_model,
+            "prompt_version": self.llm_client.prompt_version(),
+        }
+
+    def outdated(self, pdf_paths: list[Path]) -> list[Path]:
+        # A paper needs reprocessing only if its bytes, the embedding model, the
+        # LLM model or a hop prompt changed since it was stored. The manifest
+        # supplies hashes for files whose size and mtime are unchanged.
+        known = self.manifest.get_many(str(path.resolve()) for path in pdf_paths) if self.manifest else {}
+        identities: dict[Path, tuple[str, str]] = {}
+        for path in pdf_paths:
+            entry = known.get(str(path.resolve()))
+            stat = path.stat()
+            if entry is not None and (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                identities[path] = (self.store.content_paper_id(entry.content_hash), entry.content_hash)
+            else:
+                identities[path] = self.identify(path)
+
+        paper_ids = sorted({paper_id for paper_id, _ in identities.values()})
+        stored: dict[str, dict] = {}
+        for start in range(0, len(paper_ids), PaperStore.PAGE_SIZE):
+            stored.update(self.store.get_papers(paper_ids[start : start + PaperStore.PAGE_SIZE]))
+        current = self.analysis_versions()
+        outdated: list[Path] = []
+        for path, (paper_id, content_hash) in identities.items():
+            row = stored.get(paper_id)
+            meta = row["metadata"] if row else {}
+            stale = any(meta.get(key) != value for key, value in current.items())
+            if stale or meta.get("content_hash") != content_hash:
+                outdated.append(path)
+        return outdated
+
+    @staticmethod
+    def embedding_source(indexed: IndexedPaper) -> str:
+        return (
             f"{indexed.title}\n"
             f"{indexed.insight.summary}\n"
             f"{' '.join(indexed.insight.innovations)}\n"
@@ -53,13 +384,164 @@ class IngestionPipeline:
             f"{' '.join(indexed.insight.next_steps)}\n"
             f"{' '.join(indexed.insight.research_ideas)}"
         )
-        embedding = self.embedder.embed([embedding_source])[0]
-        self.store.upsert(indexed, embedding)
+
+    def store_indexed(
+        self,
+        items: list[IndexedPaper],
+        embeddings: np.ndarray | list[np.ndarray],
+        content_hashes: list[str] | None = None,
+    ) -> None:
+        # Upsert and report are journaled separately, so a paper interrupted
+        # after its upsert only needs the report on resume.
+        hashes = content_hashes or [""] * len(items)
+        states = self.journal_states(hashes)
+        upsert = [index for index, content_hash in enumerate(hashes) if "upsert" not in states.get(content_hash, {})]
+        if upsert:
+            pending = [items[index] for index in upsert]
+            self.store.upsert_many(pending, [embeddings[index] for index in upsert])
+            self.index_passages(pending)
+            self.index_signatures(pending)
+            for index in upsert:
+                self.journal_record(hashes[index], "upsert")
         if self.reports_dir is not None:
-            generate_paper_report(indexed, self.reports_dir)
+            for indexed, content_hash in zip(items, hashes):
+                if "report" not in states.get(content_hash, {}):
+                    generate_paper_report(indexed, self.reports_dir)
+                    self.journal_record(content_hash, "report")
+
+    def existing_source(self, paper_id: str) -> str:
+        # Re-indexing without an explicit source keeps where the paper came from.
+        existing = self.store.get_papers([paper_id]).get(paper_id)
+        return str(existing["metadata"].get("source", "local")) if existing else "local"
+
+    def build_passages(self, indexed: IndexedPaper) -> list[Passage]:
+        return split_passages(indexed.paper_id, indexed.parsed, self.passage_size, self.passage_overlap)
+
+    def index_passages(self, items: list[IndexedPaper]) -> None:
+        passages = [passage for indexed in items for passage in self.build_passages(indexed)]
+        vectors = [
+            self.embedder.embed([passage.text for passage in passages[start : start + self.PASSAGE_EMBED_BATCH]])
+            for start in range(0, len(passages), self.PASSAGE_EMBED_BATCH)
+        ]
+        embeddings = np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        self.store.replace_passages(items, passages, embeddings)
+
+    @staticmethod
+    def skipped_message(pdf_path: Path) -> str:
+        return f"Skipped {pdf_path.name} (already indexed)."
+
+    def indexed_message(self, pdf_path: Path, force: bool, indexed: IndexedPaper | None = None) -> str:
         action = "Re-indexed" if force else "Indexed"
-        return f"{action} {pdf_path.name}"
+        notes: list[str] = []
+        if indexed is not None and indexed.near_duplicate_of:
+            notes.append(
+                f"near-duplicate of {indexed.near_duplicate_of}, "
+                f"similarity {indexed.near_duplicate_score:.2f}; analysis reused"
+            )
+        if indexed is not None:
+            parsed = indexed.parsed
+            if parsed.page_count > len(parsed.page_texts) > 0:
+                notes.append(f"first {len(parsed.page_texts)} of {parsed.page_count} pages")
+            slow = slow_pages(parsed, self.parse_options.slow_page_seconds)
+            if slow:
+                listed = ", ".join(f"p{number} {seconds:.1f}s" for number, seconds in slow[:5])
+                notes.append(f"slow pages: {listed}")
+        return f"{action} {pdf_path.name}" + (f" ({'; '.join(notes)})" if notes else "")
 
-    def query(self, text: str, limit: int = 10) -> list[dict]:
+    def query(
+        self,
+        text: str,
+        limit: int = 10,
+        mode: str = "paper",
+        aggregate: str = "max",
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict]:
+        filters = {"method_type": method_type, "since": since, "until": until, "source": source}
         query_embedding = self.embedder.embed([text])[0]
-        return self.store.query(text, query_embedding, limit=limit)
+        candidates = limit * self.HYBRID_CANDIDATE_FACTOR if self.hybrid_search else limit
+        if mode == "passage":
+            vector_rows = self.query_passages(query_embedding, limit=candidates, aggregate=aggregate, **filters)
+        else:
+            vector_rows = self.store.query(text, query_embedding, limit=candidates, **filters)
+        if not self.hybrid_search:
+            return vector_rows
+
+        lexical_hits = self.store.lexical_search(text, limit=candidates)
+        where = self.store.build_where(**filters)
+        if where is not None and lexical_hits:
+            allowed = self.store.get_papers([paper_id for paper_id, _ in lexical_hits], where=where)
+            lexical_hits = [hit for hit in lexical_hits if hit[0] in allowed]
+        return self.fuse_rankings(vector_rows, lexical_hits, limit)
+
+    def fuse_rankings(self, vector_rows: list[dict], lexical_hits: list[tuple[str, float]], limit: int) -> list[dict]:
+        # Reciprocal rank fusion: only ranks matter, so cosine and BM25 scores
+        # never have to be put on the same scale.
+        fused: dict[str, float] = {}
+        rows: dict[str, dict] = {}
+        for rank, row in enumerate(vector_rows, start=1):
+            paper_id = row["metadata"]["paper_id"]
+            fused[paper_id] = fused.get(paper_id, 0.0) + 1 / (self.RRF_K + rank)
+            rows[paper_id] = {**row, "vector_score": row["score"], "bm25_score": None}
+        for rank, (paper_id, bm25_score) in enumerate(lexical_hits, start=1):
+            fused[paper_id] = fused.get(paper_id, 0.0) + 1 / (self.RRF_K + rank)
+            if paper_id in rows:
+                rows[paper_id]["bm25_score"] = bm25_score
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+        lexical_only = self.store.get_papers([paper_id for paper_id in ranked if paper_id not in rows])
+        scores = dict(lexical_hits)
+        for paper_id, paper in lexical_only.items():
+            rows[paper_id] = {**paper, "vector_score": None, "bm25_score": scores[paper_id]}
+
+        merged: list[dict] = []
+        for paper_id in ranked:
+            if paper_id in rows:
+                merged.append({**rows[paper_id], "score": round(fused[paper_id], 4)})
+        return merged
+
+    def query_passages(
+        self,
+        query_embedding: np.ndarray,
+        limit: int = 10,
+        aggregate: str = "max",
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict]:
+        hits = self.store.query_passages(
+            query_embedding,
+            limit=limit * self.PASSAGE_CANDIDATES_PER_RESULT,
+            method_type=method_type,
+            since=since,
+            until=until,
+            source=source,
+        )
+        by_paper: dict[str, list[dict]] = {}
+        for hit in hits:
+            by_paper.setdefault(hit["metadata"]["paper_id"], []).append(hit)
+
+        def paper_score(paper_hits: list[dict]) -> float:
+            if aggregate == "topk-sum":
+                return sum(hit["score"] for hit in paper_hits[: self.PASSAGE_TOP_K])
+            return paper_hits[0]["score"]
+
+        ranked = sorted(by_paper.items(), key=lambda entry: paper_score(entry[1]), reverse=True)[:limit]
+        papers = self.store.get_papers([paper_id for paper_id, _ in ranked])
+        rows: list[dict] = []
+        for paper_id, paper_hits in ranked:
+            paper = papers.get(paper_id)
+            if paper is None:
+                continue
+            rows.append(
+                {
+                    **paper,
+                    "score": round(paper_score(paper_hits), 4),
+                    "passage": paper_hits[0],
+                    "passages": paper_hits[: self.PASSAGE_TOP_K],
+                }
+            )
+        return rows
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Callable
 
-from .embeddings import Embedder
+from .embeddings import Embedder, EmbeddingService
 from .highlights import HighlightedParagraph
 from .llm_client import LocalLLMClient
 from .vector_store import PaperStore
@@ -18,7 +19,7 @@ class CompanionResponse:
 
 
 class ReadingCompanion:
-    def __init__(self, store: PaperStore, embedder: Embedder, llm_client: LocalLLMClient) -> None:
+    def __init__(self, store: PaperStore, embedder: Embedder | EmbeddingService, llm_client: LocalLLMClient) -> None:
         self.store = store
         self.embedder = embedder
         self.llm_client = llm_client
@@ -29,6 +30,7 @@ class ReadingCompanion:
         expertise_level: str = "ML researcher",
         include_simplified: bool = False,
         limit: int = 5,
+        on_partial_explanation: Callable[[str], None] | None = None,
     ) -> CompanionResponse:
         query_embedding = self.embedder.embed([highlight.text])[0]
         results = self.store.query(highlight.text, query_embedding, limit=limit)
@@ -54,6 +56,7 @@ class ReadingCompanion:
             related_concepts=related_concepts,
             expertise_level=expertise_level,
             include_simplified=include_simplified,
+            on_partial_explanation=on_partial_explanation,
         )
 
         return CompanionResponse(
@@ -139,26 +139,28 @@ def generate_paper_report_from_metadata(meta: dict, reports_dir: Path) -> Path:
     return report_path
 
 
-def generate_weekly_report(store: PaperStore, reports_dir: Path) -> Path:
+def generate_weekly_report(store: PaperStore, reports_dir: Path, page_size: int | None = None) -> Path:
     now = datetime.utcnow()
     since = now - timedelta(days=7)
-    recent = store.papers_since(since)
+    # Count with an ids-only pass, then stream one page of metadata at a time
+    # into the file so memory stays bounded by the page size.
+    recent_count = store.count_papers(since=since)
 
-    lines = [
+    header = [
         f"# Weekly Research Insights ({now.date().isoformat()})",
         "",
         f"Window: {since.date().isoformat()} to {now.date().isoformat()}",
-        f"New papers indexed: {len(recent)}",
+        f"New papers indexed: {recent_count}",
         "",
         "## Highlights",
     ]
 
-    if not recent:
-        lines.append("- No new papers indexed this week.")
-    else:
-        for row in recent:
-            lines.extend(_render_paper_sections(row["metadata"], include_header=True))
-
     report_path = reports_dir / f"weekly_{now.date().isoformat()}.md"
-    report_path.write_text("\n".join(lines), encoding="utf-8")
+    with report_path.open("w", encoding="utf-8") as handle:
+        handle.write("\n".join(header))
+        if not recent_count:
+            handle.write("\n- No new papers indexed this week.")
+        else:
+            for row in store.iter_papers(page_size=page_size, include=("metadatas",), since=since):
+                handle.write("\n" + "\n".join(_render_paper_sections(row["metadata"], include_header=True)))
     return report_path
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+
+@dataclass
+class FailedItem:
+    path: str
+    size: int
+    mtime_ns: int
+    attempts: int
+    next_attempt_at: float
+    last_error: str
+    status: str
+
+
+# Persistent record of files that failed ingestion. Each failure pushes the next
+# attempt out exponentially; after max_attempts the file is parked as dead and
+# only comes back when its bytes change or it is requeued by hand
+# (requeue_failed.py). Size and mtime are stored so a fixed file is retried at once.
+class RetryQueue:
+    RETRY = "retry"
+    DEAD = "dead"
+
+    def __init__(
+        self,
+        path: Path,
+        max_attempts: int = 5,
+        base_delay: float = 60.0,
+        max_delay: float = 6 * 3600.0,
+    ) -> None:
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "attempts INTEGER NOT NULL, next_attempt_at REAL NOT NULL, last_error TEXT NOT NULL, "
+            "status TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def delay_for(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+
+    def load(self) -> dict[str, FailedItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, attempts, next_attempt_at, last_error, status FROM failures"
+            ).fetchall()
+        return {row[0]: FailedItem(*row) for row in rows}
+
+    def record_failure(self, path: str, size: int, mtime_ns: int, error: str) -> FailedItem:
+        now = time.time()
+        # Each write runs in the connection block, which commits or rolls back,
+        # so a failed write (a lock timeout, say) cannot wedge the queue.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, attempts FROM failures WHERE path = ?", (path,)
+            ).fetchone()
+            # A file whose bytes changed since its last failure starts over.
+            attempts = row[2] + 1 if row is not None and (row[0], row[1]) == (size, mtime_ns) else 1
+            status = self.DEAD if attempts >= self.max_attempts else self.RETRY
+            next_attempt_at = now + self.delay_for(attempts) if status == self.RETRY else 0.0
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failures "
+                "(path, size, mtime_ns, attempts, next_attempt_at, last_error, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, attempts, next_attempt_at, error, status, now),
+            )
+        return FailedItem(path, size, mtime_ns, attempts, next_attempt_at, error, status)
+
+    def clear(self, paths: Iterable[str]) -> None:
+        rows = [(path,) for path in dict.fromkeys(paths)]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM failures WHERE path = ?", rows)
+
+    def requeue(self, paths: Iterable[str] | None = None) -> int:
+        # Resets the attempt count and makes the item due immediately. Without
+        # paths every dead-lettered item is requeued.
+        now = time.time()
+        with self._lock, self._conn:
+            if paths is None:
+                cursor = self._conn.execute(
+                    "UPDATE failures SET attempts = 0, next_attempt_at = 0, status = ?, updated_at = ? "
+                    "WHERE status = ?",
+                    (self.RETRY, now, self.DEAD),
+                )
+                return cursor.rowcount
+            self._conn.execute("BEGIN")
+            requeued = 0
+            for path in dict.fromkeys(paths):
+                cursor = self._conn.execute(
+                    "UPDATE failures SET attempts = 0, next_attempt_at = 0, status = ?, updated_at = ? "
+                    "WHERE path = ?",
+                    (self.RETRY, now, path),
+                )
+                requeued += cursor.rowcount
+        return requeued
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM failures GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
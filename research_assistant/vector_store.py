@@ -1,37 +1,259 @@
 from __future__ import annotations
 
 import hashlib
-from datetime import datetime
-from typing import Any
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Sequence
 
 import chromadb
+import numpy as np
 from chromadb.api.models.Collection import Collection
 
+from .lexical_index import LexicalIndex
 from .models import IndexedPaper
+from .passages import Passage, join_passages
+
+
+def _timestamp(moment: datetime) -> int:
+    # added_at is naive UTC throughout the app; Chroma can only range-filter numbers.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
 
 
 class PaperStore:
-    def __init__(self, chroma_path: str) -> None:
+    PAGE_SIZE = 256
+    # Bumped when stored rows need a one-off migration; the version reached is
+    # kept next to the Chroma files, like PRAGMA user_version for SQLite.
+    SCHEMA_VERSION = 1
+
+    def __init__(self, chroma_path: str, lexical_dir: Path | None = None) -> None:
         client = chromadb.PersistentClient(path=chroma_path)
+        self._schema_path = Path(chroma_path) / "schema_version"
         self.collection: Collection = client.get_or_create_collection(
             name="papers", metadata={"hnsw:space": "cosine"}
         )
+        self.passages: Collection = client.get_or_create_collection(
+            name="passages", metadata={"hnsw:space": "cosine"}
+        )
+        if self._schema_version() < self.SCHEMA_VERSION:
+            self.backfill_timestamps()
+            self._schema_path.write_text(str(self.SCHEMA_VERSION), encoding="utf-8")
+        self.lexical: LexicalIndex | None = None
+        if lexical_dir is not None:
+            self.lexical = LexicalIndex(lexical_dir)
+            if len(self.lexical) == 0 and self.collection.count() > 0:
+                self.rebuild_lexical_index()
+
+    def _schema_version(self) -> int:
+        try:
+            return int(self._schema_path.read_text(encoding="utf-8").strip())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def backfill_timestamps(self) -> int:
+        # Rows written before added_ts/source existed cannot match the date or
+        # source filters. Runs once per store (see SCHEMA_VERSION).
+        total = self.collection.count()
+        if not total:
+            return 0
+        if self.count_papers(since=datetime(1970, 1, 1)) >= total:
+            return 0
+
+        backfilled = 0
+        for page in self._iter_pages(self.collection, ["metadatas"]):
+            updates: dict[str, dict[str, Any]] = {}
+            method_types: dict[str, str] = {}
+            for paper_id, meta in zip(page["ids"], page["metadatas"]):
+                if "added_ts" in meta:
+                    continue
+                try:
+                    added_at = datetime.fromisoformat(str(meta.get("added_at", "")))
+                except ValueError:
+                    added_at = datetime.utcnow()
+                updates[paper_id] = {"added_ts": _timestamp(added_at), "source": meta.get("source", "local")}
+                method_types[paper_id] = str(meta.get("method_type", "other"))
+            if not updates:
+                continue
+            self.collection.update(ids=list(updates), metadatas=list(updates.values()))
+
+            passages = self.passages.get(where={"paper_id": {"$in": list(updates)}}, include=["metadatas"])
+            if passages.get("ids"):
+                self.passages.update(
+                    ids=passages["ids"],
+                    metadatas=[
+                        {**updates[meta["paper_id"]], "method_type": method_types[meta["paper_id"]]}
+                        for meta in passages["metadatas"]
+                    ],
+                )
+            backfilled += len(updates)
+        return backfilled
+
+    @staticmethod
+    def build_where(
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> dict[str, Any] | None:
+        clauses: list[dict[str, Any]] = []
+        for key, value in (("method_type", method_type), ("source", source)):
+            if isinstance(value, str) and value:
+                clauses.append({key: value})
+            elif value:
+                clauses.append({key: {"$in": list(value)}})
+        if since is not None:
+            clauses.append({"added_ts": {"$gte": _timestamp(since)}})
+        if until is not None:
+            clauses.append({"added_ts": {"$lt": _timestamp(until)}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
     @staticmethod
     def build_paper_id(file_path: str) -> str:
+        # Legacy identity (hash of the resolved path); papers indexed before
+        # content ids keep it until they are re-indexed.
         return hashlib.sha256(file_path.encode("utf-8")).hexdigest()[:24]
 
+    @staticmethod
+    def content_paper_id(content_hash: str) -> str:
+        return content_hash[:24]
+
     def exists(self, paper_id: str) -> bool:
         found = self.collection.get(ids=[paper_id])
         return bool(found.get("ids"))
 
-    def upsert(self, item: IndexedPaper, embedding: list[float]) -> None:
-        metadata = {
+    def existing_ids(self, paper_ids: list[str]) -> set[str]:
+        if not paper_ids:
+            return set()
+        found = self.collection.get(ids=paper_ids, include=[])
+        return set(found.get("ids") or [])
+
+    def upsert(self, item: IndexedPaper, embedding: np.ndarray) -> None:
+        self.upsert_many([item], [embedding])
+
+    def upsert_many(self, items: list[IndexedPaper], embeddings: np.ndarray | list[np.ndarray]) -> None:
+        if not items:
+            return
+        self.collection.upsert(
+            ids=[item.paper_id for item in items],
+            documents=[self._document(item) for item in items],
+            metadatas=[self._metadata(item) for item in items],
+            embeddings=self._to_chroma(embeddings),
+        )
+        if self.lexical is not None:
+            self.lexical.upsert({item.paper_id: self._lexical_text(item) for item in items})
+
+    def delete_papers(self, paper_ids: list[str]) -> None:
+        if not paper_ids:
+            return
+        self.collection.delete(ids=paper_ids)
+        self.passages.delete(where={"paper_id": {"$in": paper_ids}})
+        if self.lexical is not None:
+            self.lexical.remove(paper_ids)
+        # Papers whose analysis was reused from a deleted one keep it, but the
+        # near-duplicate link would point at nothing.
+        linked = self.collection.get(where={"near_duplicate_of": {"$in": paper_ids}}, include=[])
+        if linked.get("ids"):
+            self.collection.update(
+                ids=linked["ids"],
+                metadatas=[{"near_duplicate_of": "", "near_duplicate_score": 0.0} for _ in linked["ids"]],
+            )
+
+    def update_file_path(self, paper_id: str, file_path: str) -> None:
+        if self.exists(paper_id):
+            self.collection.update(ids=[paper_id], metadatas=[{"file_path": file_path}])
+
+    def iter_full_texts(self, page_size: int | None = None) -> Iterator[tuple[str, str, str]]:
+        # Full text is not kept on the paper rows; it survives in the passage
+        # collection, so stitch it back in passage order. Yields (paper_id,
+        # paper document, full text) one Chroma page at a time.
+        for page in self._iter_pages(self.collection, include=["documents"], page_size=page_size):
+            passages = self.passages.get(where={"paper_id": {"$in": page["ids"]}}, include=["documents", "metadatas"])
+            chunks: dict[str, list[tuple[int, str, int | None]]] = {}
+            for doc, meta in zip(passages.get("documents") or [], passages.get("metadatas") or []):
+                chunks.setdefault(meta["paper_id"], []).append(
+                    (int(meta.get("index", 0)), doc, meta.get("overlap_words"))
+                )
+            for paper_id, doc in zip(page["ids"], page["documents"]):
+                ordered = sorted(chunks.get(paper_id, []), key=lambda chunk: chunk[0])
+                yield paper_id, doc, join_passages((text, overlap) for _, text, overlap in ordered)
+
+    def rebuild_lexical_index(self) -> None:
+        # Papers indexed before the lexical index existed.
+        if self.lexical is None:
+            return
+        batch: dict[str, str] = {}
+        for paper_id, doc, full_text in self.iter_full_texts():
+            batch[paper_id] = f"{doc}\n{full_text}"
+            if len(batch) >= self.PAGE_SIZE:
+                self.lexical.upsert(batch)
+                batch = {}
+        self.lexical.upsert(batch)
+        self.lexical.compact()
+
+    def lexical_search(self, query_text: str, limit: int = 10) -> list[tuple[str, float]]:
+        if self.lexical is None:
+            return []
+        return self.lexical.search(query_text, limit=limit)
+
+    def replace_passages(
+        self,
+        items: list[IndexedPaper],
+        passages: list[Passage],
+        embeddings: np.ndarray | list[np.ndarray],
+    ) -> None:
+        # Re-indexing can produce fewer passages than before, so clear the old set first.
+        paper_ids = [item.paper_id for item in items]
+        if paper_ids:
+            self.passages.delete(where={"paper_id": {"$in": paper_ids}})
+        if not passages:
+            return
+        papers = {item.paper_id: item for item in items}
+        self.passages.upsert(
+            ids=[passage.passage_id for passage in passages],
+            documents=[passage.text for passage in passages],
+            metadatas=[
+                {
+                    "paper_id": passage.paper_id,
+                    "title": papers[passage.paper_id].title,
+                    "index": passage.index,
+                    "page_start": passage.page_start,
+                    "page_end": passage.page_end,
+                    # Lets iter_full_texts drop the repeated words when stitching.
+                    "overlap_words": passage.overlap_words,
+                    # Copied from the paper so passage search can use the same filters.
+                    "method_type": papers[passage.paper_id].insight.method_type,
+                    "added_ts": _timestamp(papers[passage.paper_id].added_at),
+                    "source": papers[passage.paper_id].source,
+                }
+                for passage in passages
+            ],
+            embeddings=self._to_chroma(embeddings),
+        )
+
+    @staticmethod
+    def _to_chroma(embeddings: np.ndarray | list[np.ndarray]) -> list[list[float]]:
+        # Vectors stay float32 NumPy arrays everywhere else; Chroma gets plain lists.
+        return np.asarray(embeddings, dtype=np.float32).tolist()
+
+    @staticmethod
+    def _metadata(item: IndexedPaper) -> dict[str, Any]:
+        return {
             "paper_id": item.paper_id,
             "title": item.title,
             "file_path": item.parsed.file_path,
             "method_type": item.insight.method_type,
             "added_at": item.added_at.isoformat(),
+            "added_ts": _timestamp(item.added_at),
+            "source": item.source,
+            "near_duplicate_of": item.near_duplicate_of,
+            "near_duplicate_score": item.near_duplicate_score,
+            "content_hash": item.content_hash,
+            "embedding_model": item.embedding_model,
+            "llm_model": item.llm_model,
+            "prompt_version": item.prompt_version,
             "summary": item.insight.summary,
             "innovations": " || ".join(item.insight.innovations),
             "contributions": " || ".join(item.insight.contributions),
@@ -43,7 +265,14 @@ class PaperStore:
             "research_ideas": " || ".join(item.insight.research_ideas),
             "equations": " || ".join(item.parsed.equation_candidates[:20]),
         }
-        document = (
+
+    @classmethod
+    def _lexical_text(cls, item: IndexedPaper) -> str:
+        return f"{cls._document(item)}\n{item.parsed.full_text}"
+
+    @staticmethod
+    def _document(item: IndexedPaper) -> str:
+        return (
             f"Title: {item.title}\n"
             f"Method type: {item.insight.method_type}\n"
             f"Summary: {item.insight.summary}\n"
@@ -56,18 +285,22 @@ class PaperStore:
             f"Next steps: {'; '.join(item.insight.next_steps)}\n"
             f"Research ideas: {'; '.join(item.insight.research_ideas)}"
         )
-        self.collection.upsert(
-            ids=[item.paper_id],
-            documents=[document],
-            metadatas=[metadata],
-            embeddings=[embedding],
-        )
 
-    def query(self, query_text: str, query_embedding: list[float], limit: int = 10) -> list[dict[str, Any]]:
+    def query(
+        self,
+        query_text: str,
+        query_embedding: np.ndarray,
+        limit: int = 10,
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict[str, Any]]:
         results = self.collection.query(
             query_texts=[query_text],
-            query_embeddings=[query_embedding],
+            query_embeddings=self._to_chroma([query_embedding]),
             n_results=limit,
+            where=self.build_where(method_type, since, until, source),
             include=["documents", "metadatas", "distances"],
         )
 
@@ -86,18 +319,116 @@ class PaperStore:
             )
         return merged
 
-    def papers_since(self, since: datetime) -> list[dict[str, Any]]:
-        all_items = self.collection.get(include=["metadatas", "documents"])
-        rows: list[dict[str, Any]] = []
-        for meta, doc in zip(all_items.get("metadatas", []), all_items.get("documents", [])):
-            added_at = datetime.fromisoformat(meta["added_at"])
-            if added_at >= since:
-                rows.append({"metadata": meta, "document": doc})
-        return rows
-
-    def all_papers(self) -> list[dict[str, Any]]:
-        all_items = self.collection.get(include=["metadatas", "documents"])
-        rows: list[dict[str, Any]] = []
-        for meta, doc in zip(all_items.get("metadatas", []), all_items.get("documents", [])):
-            rows.append({"metadata": meta, "document": doc})
-        return rows
+    def query_passages(
+        self,
+        query_embedding: np.ndarray,
+        limit: int = 40,
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        if self.passages.count() == 0:
+            return []
+        results = self.passages.query(
+            query_embeddings=self._to_chroma([query_embedding]),
+            n_results=limit,
+            where=self.build_where(method_type, since, until, source),
+            include=["documents", "metadatas", "distances"],
+        )
+        docs = results.get("documents", [[]])[0]
+        metadatas = results.get("metadatas", [[]])[0]
+        distances = results.get("distances", [[]])[0]
+        return [
+            {"text": doc, "metadata": meta, "score": round(1 - float(distance), 4)}
+            for doc, meta, distance in zip(docs, metadatas, distances)
+        ]
+
+    def get_papers(self, paper_ids: list[str], where: dict[str, Any] | None = None) -> dict[str, dict[str, Any]]:
+        if not paper_ids:
+            return {}
+        found = self.collection.get(ids=paper_ids, where=where, include=["metadatas", "documents"])
+        return {
+            paper_id: {"metadata": meta, "document": doc}
+            for paper_id, meta, doc in zip(found.get("ids", []), found.get("metadatas", []), found.get("documents", []))
+        }
+
+    def iter_papers(
+        self,
+        page_size: int | None = None,
+        include: Sequence[str] = ("metadatas",),
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        # Rows only carry the fields that were asked for, so metadata-only callers
+        # never pull documents out of Chroma.
+        where = self.build_where(method_type, since, until, source)
+        for page in self._iter_pages(self.collection, list(include), where, page_size):
+            metadatas = page.get("metadatas") or [None] * len(page["ids"])
+            documents = page.get("documents") or [None] * len(page["ids"])
+            for paper_id, meta, doc in zip(page["ids"], metadatas, documents):
+                row: dict[str, Any] = {"paper_id": paper_id}
+                if "metadatas" in include:
+                    row["metadata"] = meta
+                if "documents" in include:
+                    row["document"] = doc
+                yield row
+
+    def count_papers(
+        self,
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> int:
+        where = self.build_where(method_type, since, until, source)
+        if where is None:
+            return self.collection.count()
+        return sum(len(page["ids"]) for page in self._iter_pages(self.collection, [], where, page_size=4096))
+
+    def _iter_pages(
+        self,
+        collection: Collection,
+        include: list[str],
+        where: dict[str, Any] | None = None,
+        page_size: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        page_size = max(1, page_size or self.PAGE_SIZE)
+        offset = 0
+        while True:
+            page = collection.get(where=where, include=include, limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                return
+            yield page
+            if len(ids) < page_size:
+                return
+            offset += len(ids)
+
+    def papers_since(
+        self,
+        since: datetime,
+        method_type: str | list[str] | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        return self.all_papers(method_type=method_type, since=since, source=source)
+
+    def all_papers(
+        self,
+        method_type: str | list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        source: str | list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        return [
+            {"metadata": row["metadata"], "document": row["document"]}
+            for row in self.iter_papers(
+                include=("metadatas", "documents"),
+                method_type=method_type,
+                since=since,
+                until=until,
+                source=source,
+            )
+        ]
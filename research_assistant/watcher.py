@@ -1,32 +1,382 @@
 from __future__ import annotations
 
+import heapq
+import json
+import os
+import threading
 import time
 from pathlib import Path
+from typing import Iterable
 
+from .ingest_engine import IngestResult, StagedIngestionEngine
+from .manifest import IngestManifest, ManifestEntry
 from .pipeline import IngestionPipeline
+from .retry_queue import FailedItem, RetryQueue
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional; polling still works without it
+    FileSystemEventHandler = object  # type: ignore[assignment,misc]
+    FileSystemEvent = object  # type: ignore[assignment,misc]
+    Observer = None
+
+WATCH_MODES = ("auto", "events", "poll")
+WATCH_PRIORITIES = ("newest", "smallest", "name")
+
+
+class _PdfEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: FolderWatcher) -> None:
+        super().__init__()
+        self.watcher = watcher
+
+    # inotify reports close-after-write, so a finished copy is seen right away;
+    # created/modified cover platforms without close events (the size debounce
+    # holds those back until the copy has finished).
+    def on_closed(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.enqueue(event.src_path, changed=True)
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.enqueue(event.src_path, changed=True)
+
+    def on_modified(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.enqueue(event.src_path, changed=True)
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.enqueue(event.dest_path, changed=True)
 
 
 class FolderWatcher:
-    def __init__(self, watch_dir: Path, pipeline: IngestionPipeline, interval_seconds: int = 10) -> None:
-        self.watch_dir = watch_dir
+    TICK_SECONDS = 0.5
+
+    def __init__(
+        self,
+        watch_dir: Path,
+        pipeline: IngestionPipeline,
+        interval_seconds: int = 10,
+        engine: StagedIngestionEngine | None = None,
+        mode: str = "auto",
+        recursive: bool = False,
+        settle_seconds: float = 2.0,
+        retry_queue: RetryQueue | None = None,
+        priority: str = "newest",
+        priority_dir: Path | None = None,
+        max_in_flight: int = 16,
+        status_path: Path | None = None,
+    ) -> None:
+        if mode not in WATCH_MODES:
+            raise ValueError(f"Unknown watch mode {mode!r}; expected one of {', '.join(WATCH_MODES)}")
+        if priority not in WATCH_PRIORITIES:
+            raise ValueError(f"Unknown watch priority {priority!r}; expected one of {', '.join(WATCH_PRIORITIES)}")
+        self.watch_dir = watch_dir.resolve()
         self.pipeline = pipeline
         self.interval_seconds = interval_seconds
+        self.engine = engine or StagedIngestionEngine(pipeline)
+        self.mode = mode
+        self.recursive = recursive
+        self.settle_seconds = max(0.0, settle_seconds)
+        self.manifest = pipeline.manifest
+        self.retry_queue = retry_queue
+        self.priority = priority
+        if priority_dir is not None and not priority_dir.is_absolute():
+            priority_dir = self.watch_dir / priority_dir
+        self.priority_dir = priority_dir.resolve() if priority_dir is not None else None
+        self.max_in_flight = max(1, max_in_flight)
+        self.status_path = status_path
+        self._known: dict[str, ManifestEntry] = {}
+        self._failures: dict[str, FailedItem] = {}
         self._seen: set[str] = set()
+        # path -> (size, mtime_ns, unchanged since); a file is ingested once it
+        # has kept the same size and mtime for settle_seconds.
+        self._pending: dict[str, tuple[int, int, float]] = {}
+        # Settled files wait in a heap ordered by the priority policy and are
+        # handed to the engine at most max_in_flight at a time, so a paper dropped
+        # in during a bulk import jumps ahead of the backlog. _ready holds the
+        # live key per path; heap entries whose key no longer matches are stale.
+        self._ready: dict[str, tuple[int, int | str]] = {}
+        self._heap: list[tuple[tuple[int, int | str], str]] = []
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._seconds_per_file = 0.0
+        self._status_written = 0.0
+        self._lock = threading.Lock()
 
     def _list_pdfs(self) -> list[Path]:
-        return sorted(self.watch_dir.glob("*.pdf"))
+        pattern = "**/*.pdf" if self.recursive else "*.pdf"
+        paths = set(self.watch_dir.glob(pattern))
+        if self.priority_dir is not None:
+            paths.update(self.priority_dir.glob(pattern))
+        return sorted(paths)
+
+    def _priority_dir_covered(self) -> bool:
+        return self.priority_dir is None or (self.recursive and self.priority_dir.is_relative_to(self.watch_dir))
+
+    def enqueue(self, path: str | bytes | os.PathLike[str], changed: bool = False) -> None:
+        # Scans only queue unseen paths; a file event means the bytes may have
+        # changed, so the manifest check in _ingest decides instead.
+        path = os.fsdecode(path)
+        if not path.lower().endswith(".pdf"):
+            return
+        with self._lock:
+            if changed:
+                # The file may still be growing; send it back through the debounce.
+                self._seen.discard(path)
+                self._ready.pop(path, None)
+            if path not in self._seen and path not in self._pending and path not in self._ready:
+                self._pending[path] = (-1, -1, time.monotonic())
+
+    def _enqueue_all(self, paths: Iterable[Path]) -> None:
+        for path in paths:
+            self.enqueue(path)
+
+    def _priority_key(self, path: str, size: int, mtime_ns: int) -> tuple[int, int | str]:
+        tier = 0 if self.priority_dir is not None and Path(path).is_relative_to(self.priority_dir) else 1
+        if self.priority == "newest":
+            return tier, -mtime_ns
+        if self.priority == "smallest":
+            return tier, size
+        return tier, path
+
+    def _settle(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            pending = list(self._pending.items())
+        for path, (size, mtime_ns, since) in pending:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            # A file untouched for the whole settle window (e.g. one that landed
+            # while a batch was running) needs no second look.
+            quiet = time.time() - stat.st_mtime_ns / 1e9 >= self.settle_seconds
+            with self._lock:
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns) and not quiet:
+                    self._pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                elif stat.st_size > 0 and (quiet or now - since >= self.settle_seconds):
+                    self._pending.pop(path, None)
+                    key = self._priority_key(path, stat.st_size, stat.st_mtime_ns)
+                    self._ready[path] = key
+                    heapq.heappush(self._heap, (key, path))
+
+    def _next_batch(self) -> list[Path]:
+        batch: list[Path] = []
+        with self._lock:
+            while self._heap and len(batch) < self.max_in_flight:
+                key, path = heapq.heappop(self._heap)
+                if self._ready.get(path) == key:
+                    del self._ready[path]
+                    batch.append(Path(path))
+        return batch
+
+    def _unchanged(self, path: Path) -> bool:
+        entry = self._known.get(str(path))
+        if entry is None or entry.status != IngestManifest.INDEXED:
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        return (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+    def _blocked(self, path: Path) -> bool:
+        # A failed file waits out its backoff (or stays parked once dead-lettered)
+        # unless its bytes changed since the failure, which earns a fresh start.
+        failure = self._failures.get(str(path))
+        if failure is None:
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return True
+        if (failure.size, failure.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return False
+        return failure.status == RetryQueue.DEAD or failure.next_attempt_at > time.time()
+
+    def _enqueue_due_retries(self) -> None:
+        now = time.time()
+        for path, failure in list(self._failures.items()):
+            if failure.status != RetryQueue.RETRY or failure.next_attempt_at > now:
+                continue
+            if os.path.exists(path):
+                self.enqueue(path)
+            else:
+                self._failures.pop(path, None)
+                if self.retry_queue is not None:
+                    self.retry_queue.clear([path])
+
+    def _refresh_failures(self) -> None:
+        # Re-read so requeue_failed.py takes effect without restarting the watcher.
+        if self.retry_queue is not None:
+            self._failures = self.retry_queue.load()
+
+    def _ingest(self, paths: list[Path]) -> None:
+        # Unchanged files are settled from the manifest alone; everything else
+        # goes to the engine, which dedupes by content hash before parsing.
+        changed: list[Path] = []
+        for path in paths:
+            if self._unchanged(path):
+                self._mark_seen(path)
+            elif not self._blocked(path):
+                changed.append(path)
+        if not changed:
+            return
+        self._in_flight = len(changed)
+        self._write_status(force=True)
+        started = time.monotonic()
+
+        results: list[IngestResult] = []
+
+        def on_result(result: IngestResult) -> None:
+            results.append(result)
+            print(result.message)
+            self._in_flight = max(0, self._in_flight - 1)
+            self._processed += 1
+            self._failed += 0 if result.ok else 1
+            self._write_status()
+
+        try:
+            self.engine.ingest_many(changed, on_result=on_result, source="watch")
+        except Exception as exc:
+            # Files the engine never reported go to the retry queue like any other
+            # failure, so a file that crashes the batch cannot crash the watcher.
+            reported = {result.pdf_path for result in results}
+            for path in changed:
+                if path not in reported:
+                    on_result(IngestResult(path, f"Failed to process {path.name}: {exc}", False))
+        self._in_flight = 0
+        self._write_status(force=True)
+        # Smoothed per-file cost drives the drain estimate in the status file.
+        per_file = (time.monotonic() - started) / len(changed)
+        if self._seconds_per_file:
+            per_file = 0.7 * self._seconds_per_file + 0.3 * per_file
+        self._seconds_per_file = per_file
+        for result in results:
+            if result.ok:
+                self._mark_seen(result.pdf_path)
+            else:
+                self._record_failure(result.pdf_path, result.message, result.content_hash)
+        if self.retry_queue is not None:
+            succeeded = [str(result.pdf_path) for result in results if result.ok]
+            self.retry_queue.clear(succeeded)
+            for path in succeeded:
+                self._failures.pop(path, None)
+        if self.manifest is not None:
+            self._known.update(self.manifest.get_many(str(path) for path in changed))
+
+    def _record_failure(self, path: Path, error: str, content_hash: str = "") -> None:
+        if self.retry_queue is None:
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return
+        failure = self.retry_queue.record_failure(str(path), stat.st_size, stat.st_mtime_ns, error)
+        self._failures[str(path)] = failure
+        if failure.status == RetryQueue.DEAD:
+            # A requeued file starts over, so its journaled stages are dead weight.
+            if content_hash:
+                self.pipeline.journal_finish([content_hash])
+            print(
+                f"Giving up on {path.name} after {failure.attempts} attempts; "
+                "run requeue_failed.py once it is fixed."
+            )
+        else:
+            delay = max(0, round(failure.next_attempt_at - time.time()))
+            print(f"Retrying {path.name} in {delay}s (attempt {failure.attempts}/{self.retry_queue.max_attempts}).")
+
+    def _mark_seen(self, path: Path) -> None:
+        with self._lock:
+            self._seen.add(str(path))
+
+    def _write_status(self, force: bool = False) -> None:
+        if self.status_path is None or (not force and time.monotonic() - self._status_written < 1.0):
+            return
+        self._status_written = time.monotonic()
+        with self._lock:
+            settling = len(self._pending)
+            queued = len(self._ready)
+        remaining = settling + queued + self._in_flight
+        retrying = sum(1 for failure in self._failures.values() if failure.status == RetryQueue.RETRY)
+        status = {
+            "updated_at": time.time(),
+            "priority": self.priority,
+            "settling": settling,
+            "queued": queued,
+            "in_flight": self._in_flight,
+            "processed": self._processed,
+            "failed": self._failed,
+            "retrying": retrying,
+            "dead_letters": len(self._failures) - retrying,
+            "seconds_per_file": round(self._seconds_per_file, 2),
+            "eta_seconds": round(remaining * self._seconds_per_file) if self._seconds_per_file else None,
+        }
+        # Written to a temp file and renamed so readers never see a partial document.
+        temp_path = self.status_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(status, indent=2), encoding="utf-8")
+        os.replace(temp_path, self.status_path)
+
+    def _start_observer(self) -> object | None:
+        if self.mode == "poll":
+            return None
+        if Observer is None:
+            if self.mode == "events":
+                raise RuntimeError("WATCH_MODE=events needs the watchdog package (pip install watchdog).")
+            return None
+        observer = Observer()
+        try:
+            observer.schedule(_PdfEventHandler(self), str(self.watch_dir), recursive=self.recursive)
+            if not self._priority_dir_covered():
+                observer.schedule(_PdfEventHandler(self), str(self.priority_dir), recursive=self.recursive)
+            observer.start()
+        except OSError as exc:
+            # e.g. the inotify watch limit on a very large tree, or an unsupported share.
+            if self.mode == "events":
+                raise
+            print(f"File events unavailable ({exc}); falling back to polling every {self.interval_seconds}s.")
+            return None
+        return observer
 
     def run_forever(self) -> None:
         self.watch_dir.mkdir(parents=True, exist_ok=True)
-        print(f"Watching {self.watch_dir} for new PDFs...")
-        while True:
-            for pdf_path in self._list_pdfs():
-                if str(pdf_path.resolve()) in self._seen:
-                    continue
-                try:
-                    message = self.pipeline.ingest_pdf(pdf_path)
-                    print(message)
-                    self._seen.add(str(pdf_path.resolve()))
-                except Exception as exc:
-                    print(f"Failed to process {pdf_path.name}: {exc}")
-            time.sleep(self.interval_seconds)
+        if self.priority_dir is not None:
+            self.priority_dir.mkdir(parents=True, exist_ok=True)
+        observer = self._start_observer()
+        kind = "file events" if observer is not None else f"polling every {self.interval_seconds}s"
+        scope = "recursively " if self.recursive else ""
+        print(f"Watching {self.watch_dir} {scope}for new PDFs ({kind})...")
+
+        # Existing files are picked up once at start; after that only events
+        # (or the periodic scan when polling) add candidates. Files the manifest
+        # already knows (same size and mtime) are skipped with one bulk load.
+        if self.manifest is not None:
+            self._known = self.manifest.load()
+        self._refresh_failures()
+        existing = self._list_pdfs()
+        for path in existing:
+            if self._unchanged(path):
+                self._mark_seen(path)
+        self._enqueue_all(existing)
+        next_scan = time.monotonic() + self.interval_seconds
+        try:
+            while True:
+                if time.monotonic() >= next_scan:
+                    self._refresh_failures()
+                    if observer is None:
+                        self._enqueue_all(self._list_pdfs())
+                    next_scan = time.monotonic() + self.interval_seconds
+                self._enqueue_due_retries()
+                self._settle()
+                self._ingest(self._next_batch())
+                self._write_status(force=not self._ready)
+                time.sleep(self.TICK_SECONDS)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
@@ -1,28 +1,35 @@
+from pathlib import Path
+
+from research_assistant.app import build_engine, build_pipeline
 from research_assistant.config import get_settings
-from research_assistant.embeddings import Embedder
-from research_assistant.llm_client import LocalLLMClient
-from research_assistant.pipeline import IngestionPipeline
-from research_assistant.vector_store import PaperStore
+from research_assistant.retry_queue import RetryQueue
 from research_assistant.watcher import FolderWatcher
 
 
 
 def main() -> None:
     settings = get_settings()
-    store = PaperStore(str(settings.chroma_dir))
-    embedder = Embedder(settings.embedding_model)
-    llm_client = LocalLLMClient(settings)
-    pipeline = IngestionPipeline(
-        store=store,
-        embedder=embedder,
-        llm_client=llm_client,
-        reports_dir=settings.reports_dir,
-    )
+    pipeline = build_pipeline(settings)
+    engine = build_engine(pipeline, settings)
 
     watcher = FolderWatcher(
         watch_dir=settings.watch_dir,
         pipeline=pipeline,
         interval_seconds=settings.watch_interval,
+        engine=engine,
+        mode=settings.watch_mode,
+        recursive=settings.watch_recursive,
+        settle_seconds=settings.watch_settle_seconds,
+        retry_queue=RetryQueue(
+            settings.data_dir / "ingest_retry_queue.sqlite3",
+            max_attempts=settings.ingest_max_attempts,
+            base_delay=settings.ingest_retry_base_seconds,
+            max_delay=settings.ingest_retry_max_seconds,
+        ),
+        priority=settings.watch_priority,
+        priority_dir=Path(settings.watch_priority_dir) if settings.watch_priority_dir else None,
+        max_in_flight=settings.watch_max_in_flight,
+        status_path=settings.data_dir / "watcher_status.json",
     )
     watcher.run_forever()
 
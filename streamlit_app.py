@@ -2,21 +2,25 @@ from __future__ import annotations
 
 import base64
 import html
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import streamlit as st
 import streamlit.components.v1 as components
 
+from research_assistant import app
 from research_assistant.arxiv_client import ArxivClient
 from research_assistant.config import get_settings
-from research_assistant.embeddings import Embedder
 from research_assistant.highlights import extract_highlighted_paragraphs
-from research_assistant.llm_client import LocalLLMClient
+from research_assistant.ingest_engine import StagedIngestionEngine
 from research_assistant.pipeline import IngestionPipeline
 from research_assistant.reading_companion import ReadingCompanion
 from research_assistant.report import generate_weekly_report
 from research_assistant.vector_store import PaperStore
 
+METHOD_TYPES = ["scaling law", "optimization", "RL", "architecture", "systems", "data", "theory", "other"]
+ADDED_WINDOWS = {"any time": 0, "last 7 days": 7, "last 30 days": 30, "last 90 days": 90, "last year": 365}
+
 
 def apply_styles() -> None:
     st.markdown(
@@ -223,20 +227,16 @@ def apply_styles() -> None:
 
 
 @st.cache_resource
-def build_pipeline() -> tuple[IngestionPipeline, PaperStore, ReadingCompanion, ArxivClient, Path, Path]:
+def build_pipeline() -> tuple[
+    IngestionPipeline, StagedIngestionEngine, PaperStore, ReadingCompanion, ArxivClient, Path, Path
+]:
     settings = get_settings()
-    store = PaperStore(str(settings.chroma_dir))
-    embedder = Embedder(settings.embedding_model)
-    llm_client = LocalLLMClient(settings)
-    pipeline = IngestionPipeline(
-        store=store,
-        embedder=embedder,
-        llm_client=llm_client,
-        reports_dir=settings.reports_dir,
-    )
-    companion = ReadingCompanion(store=store, embedder=embedder, llm_client=llm_client)
+    pipeline = app.build_pipeline(settings)
+    engine = app.build_engine(pipeline, settings)
+    store = pipeline.store
+    companion = ReadingCompanion(store=store, embedder=pipeline.embedder, llm_client=pipeline.llm_client)
     arxiv_client = ArxivClient()
-    return pipeline, store, companion, arxiv_client, settings.reports_dir, settings.watch_dir
+    return pipeline, engine, store, companion, arxiv_client, settings.reports_dir, settings.watch_dir
 
 
 def render_pdf_viewer(pdf_path: Path) -> None:
@@ -267,7 +267,7 @@ def render_report_preview(report_file: Path) -> None:
 st.set_page_config(page_title="Local Research Assistant", layout="wide")
 apply_styles()
 
-pipeline, store, companion, arxiv_client, reports_dir, watch_dir = build_pipeline()
+pipeline, engine, store, companion, arxiv_client, reports_dir, watch_dir = build_pipeline()
 pdf_files = sorted(watch_dir.glob("*.pdf"))
 weekly_reports = sorted(reports_dir.glob("weekly_*.md"), reverse=True)
 paper_reports = sorted((reports_dir / "papers").glob("*.md"), reverse=True)
@@ -303,16 +303,26 @@ tab_ingest, tab_search, tab_discover, tab_reports, tab_companion = st.tabs(
 )
 
 with tab_ingest:
-    st.subheader("Ingest a PDF")
-    st.markdown("<p class='section-note'>Upload a PDF to parse, analyze, embed, and index it locally.</p>", unsafe_allow_html=True)
-    uploaded = st.file_uploader("Drop a PDF", type=["pdf"])
-    if uploaded is not None:
-        temp_path = Path("papers") / uploaded.name
-        temp_path.write_bytes(uploaded.read())
+    st.subheader("Ingest PDFs")
+    st.markdown(
+        "<p class='section-note'>Upload one or more PDFs to parse, analyze, embed, and index them locally.</p>",
+        unsafe_allow_html=True,
+    )
+    uploaded_files = st.file_uploader("Drop PDFs", type=["pdf"], accept_multiple_files=True)
+    if uploaded_files:
+        temp_paths: list[Path] = []
+        for uploaded in uploaded_files:
+            temp_path = Path("papers") / uploaded.name
+            temp_path.write_bytes(uploaded.read())
+            temp_paths.append(temp_path)
         try:
-            with st.spinner("Analyzing and indexing..."):
-                msg = pipeline.ingest_pdf(temp_path)
-            st.success(msg)
+            with st.spinner(f"Analyzing and indexing {len(temp_paths)} PDF(s)..."):
+                ingest_results = engine.ingest_many(temp_paths, source="upload")
+            for result in ingest_results:
+                if result.ok:
+                    st.success(result.message)
+                else:
+                    st.error(result.message)
         except Exception as exc:
             st.error(f"Ingestion failed: {exc}")
 
@@ -320,13 +330,45 @@ with tab_search:
     st.subheader("Semantic Paper Search")
     st.markdown("<p class='section-note'>Example: show me all papers related to token routing</p>", unsafe_allow_html=True)
     query = st.text_input("Search query", placeholder="e.g. token routing in sparse MoE")
+    mode_col, aggregate_col = st.columns([1, 1])
+    with mode_col:
+        search_mode = st.radio(
+            "Match against",
+            ["paper", "passage"],
+            format_func=lambda value: "Paper summaries" if value == "paper" else "Full-text passages",
+            horizontal=True,
+        )
+    with aggregate_col:
+        passage_aggregate = st.radio(
+            "Passage ranking",
+            ["max", "topk-sum"],
+            format_func=lambda value: "Best passage" if value == "max" else "Top-3 passages summed",
+            horizontal=True,
+            disabled=search_mode != "passage",
+        )
+    method_col, window_col, source_col = st.columns([1.4, 1, 1])
+    with method_col:
+        method_filter = st.multiselect("Method type", METHOD_TYPES)
+    with window_col:
+        added_window = st.selectbox("Added", list(ADDED_WINDOWS))
+    with source_col:
+        source_filter = st.selectbox("Source", ["any", "watch", "upload", "arxiv", "local"])
     if st.button("Search papers"):
         if not query.strip():
             st.warning("Enter a query first.")
         else:
             try:
                 with st.spinner("Searching..."):
-                    results = pipeline.query(query.strip(), limit=query_limit)
+                    window_days = ADDED_WINDOWS[added_window]
+                    results = pipeline.query(
+                        query.strip(),
+                        limit=query_limit,
+                        mode=search_mode,
+                        aggregate=passage_aggregate,
+                        method_type=method_filter or None,
+                        since=datetime.utcnow() - timedelta(days=window_days) if window_days else None,
+                        source=None if source_filter == "any" else source_filter,
+                    )
             except Exception as exc:
                 st.error(f"Search failed: {exc}")
                 results = []
@@ -337,16 +379,32 @@ with tab_search:
                 meta = row["metadata"]
                 score = row["score"]
                 method = meta.get("method_type", "other")
+                match_chips = "".join(
+                    f"<span class='chip muted'>{label} {row[key]}</span>"
+                    for key, label in (("vector_score", "cosine"), ("bm25_score", "bm25"))
+                    if row.get(key) is not None
+                )
                 st.markdown(
                     f"""
                     <div class="result-card">
                       <p class="result-title">{idx}. {meta.get('title', 'Untitled')}</p>
                       <span class="chip">score {score}</span>
                       <span class="chip muted">{method}</span>
+                      {match_chips}
                     </div>
                     """,
                     unsafe_allow_html=True,
                 )
+                passage = row.get("passage")
+                if passage:
+                    passage_meta = passage["metadata"]
+                    pages = (
+                        f"p. {passage_meta['page_start']}"
+                        if passage_meta["page_start"] == passage_meta["page_end"]
+                        else f"pp. {passage_meta['page_start']}–{passage_meta['page_end']}"
+                    )
+                    st.caption(f"Matching passage ({pages}, score {passage['score']})")
+                    st.markdown(f"> {html.escape(passage['text'][:700])}")
                 with st.expander("Open details", expanded=(idx == 1)):
                     st.write(f"**Summary:** {meta.get('summary', '')}")
                     st.write(f"**Innovations:** {meta.get('innovations', '').replace(' || ', '; ')}")
@@ -427,7 +485,7 @@ with tab_discover:
                     try:
                         with st.spinner("Downloading PDF and indexing..."):
                             pdf_path = arxiv_client.download_pdf(paper.pdf_url, watch_dir)
-                            message = pipeline.ingest_pdf(pdf_path)
+                            message = pipeline.ingest_pdf(pdf_path, source="arxiv")
                         st.success(f"{message} from ArXiv.")
                     except Exception as exc:
                         st.error(f"Failed to ingest paper: {exc}")
@@ -469,7 +527,7 @@ with tab_companion:
 
         if load_clicked:
             try:
-                st.session_state["highlights"] = extract_highlighted_paragraphs(selected_pdf)
+                st.session_state["highlights"] = extract_highlighted_paragraphs(selected_pdf, pipeline.parse_cache)
                 st.success(f"Loaded {len(st.session_state['highlights'])} highlights.")
             except Exception as exc:
                 st.error(f"Failed to read highlights: {exc}")
@@ -485,36 +543,43 @@ with tab_companion:
                 format_func=lambda idx: f"Page {highlights[idx].page}: {highlights[idx].text[:140]}...",
             )
             if st.button("Explain Highlight"):
+                st.markdown(
+                    f"""
+                    <div class="companion-card">
+                      <h4>Highlighted Paragraph</h4>
+                      <p>{html.escape(highlights[chosen].text)}</p>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
+                expert_placeholder = st.empty()
+
+                def render_expert_explanation(text: str, streaming: bool = False) -> None:
+                    cursor = " ▌" if streaming else ""
+                    expert_placeholder.markdown(
+                        f"""
+                        <div class="companion-card">
+                          <h4>Expert Explanation (ML Researcher)</h4>
+                          <p>{html.escape(text)}{cursor}</p>
+                        </div>
+                        """,
+                        unsafe_allow_html=True,
+                    )
+
                 with st.spinner("Retrieving related concepts and generating explanation..."):
                     try:
                         response = companion.explain(
                             highlight=highlights[chosen],
                             expertise_level="ML researcher",
                             include_simplified=show_simplified,
+                            on_partial_explanation=lambda text: render_expert_explanation(text, streaming=True),
                         )
                     except Exception as exc:
                         st.error(f"Reading companion failed: {exc}")
                         response = None
 
                 if response is not None:
-                    st.markdown(
-                        f"""
-                        <div class="companion-card">
-                          <h4>Highlighted Paragraph</h4>
-                          <p>{html.escape(response.highlight.text)}</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                    st.markdown(
-                        f"""
-                        <div class="companion-card">
-                          <h4>Expert Explanation (ML Researcher)</h4>
-                          <p>{html.escape(response.expert_explanation or "No explanation generated.")}</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
+                    render_expert_explanation(response.expert_explanation or "No explanation generated.")
                     if show_simplified:
                         st.markdown(
                             f"""